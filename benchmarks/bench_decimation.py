@@ -0,0 +1,52 @@
+import os
+import time
+import tempfile
+import argparse
+import numpy as np
+from utils.decimation import decimate, point_budget
+from utils.render import render_chart, FIGSIZE
+
+# 对比降采样前后的渲染耗时与输出点数
+#   python -m benchmarks.bench_decimation --points 5000000 --dpi 300
+
+
+def _chart(x, y, dpi, save_path):
+    return {
+        "lines": [(x, y, "metric", "#1f77b4")],
+        "title": "metric",
+        "xlabel": "",
+        "ylabel": "",
+        "dpi": dpi,
+        "show_grid": True,
+        "font_family": "DejaVu Sans",
+        "font_size": 12,
+        "save_path": save_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=2000000)
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    x = np.arange(args.points, dtype=np.int64)
+    y = np.cumsum(rng.standard_normal(args.points)).astype(np.float32)
+    y[rng.integers(0, args.points, 10)] += 100  # 若干尖峰, 检查是否被保留
+    budget = point_budget(args.dpi, FIGSIZE)
+    print(f"{args.points} 点, dpi {args.dpi}, 点数上限 {budget}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("none", "minmax", "lttb"):
+            start = time.perf_counter()
+            dx, dy = decimate(x, y, mode, budget)
+            decimated = time.perf_counter()
+            render_chart(_chart(dx, dy, args.dpi, os.path.join(tmp, f"{mode}.png")))
+            rendered = time.perf_counter()
+            print(f"{mode:<8} 降采样 {decimated - start:7.3f} s  渲染 {rendered - decimated:7.3f} s  "
+                  f"点数 {len(dx):>9}  最大值 {dy.max():.1f}")
+
+
+if __name__ == "__main__":
+    main()
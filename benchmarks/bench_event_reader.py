@@ -0,0 +1,91 @@
+import os
+import time
+import tempfile
+import argparse
+import numpy as np
+from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+from tensorboard.util.tensor_util import make_ndarray
+from benchmarks.synthetic import write_run
+from utils.event_reader import read_event_scalars, read_event_tags
+
+# 对比 EventAccumulator 与 utils.event_reader 的解析耗时, 并逐点核对两者的解析结果
+#   python -m benchmarks.bench_event_reader --steps 200000 --image-every 100
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def _accumulator(path, size_guidance=None):
+    ea = EventAccumulator(path, size_guidance=size_guidance)
+    ea.Reload()
+    return {tag: len(ea.Scalars(tag)) for tag in ea.Tags().get("scalars", [])}
+
+
+# EventAccumulator (不采样) 读到的全部 scalar: tag -> (steps, wall_times, values)
+# simple_value 在 Scalars 中; TF2 的 tensor scalar 在 Tensors 中, 按 scalars 插件元数据筛选
+def _accumulator_series(path):
+    ea = EventAccumulator(path, size_guidance={"scalars": 0, "tensors": 0})
+    ea.Reload()
+    tags = ea.Tags()
+    expected = {}
+    for tag in tags.get("scalars", []):
+        events = ea.Scalars(tag)
+        expected[tag] = ([e.step for e in events], [e.wall_time for e in events], [e.value for e in events])
+    for tag in tags.get("tensors", []):
+        if ea.SummaryMetadata(tag).plugin_data.plugin_name != "scalars":
+            continue
+        events = ea.Tensors(tag)
+        expected[tag] = ([e.step for e in events], [e.wall_time for e in events],
+                         [float(make_ndarray(e.tensor_proto)) for e in events])
+    return expected
+
+
+# 逐点核对 step / wall_time / 值 (值按 float32 比较, 与 ScalarSeries 的存储精度一致), 不一致时抛出 AssertionError
+def check_against_accumulator(path):
+    expected = _accumulator_series(path)
+    actual = read_event_scalars(path, verify_crc=True)
+    assert set(actual) == set(expected), f"tag 不一致: {sorted(actual)} != {sorted(expected)}"
+    for tag, (steps, wall_times, values) in expected.items():
+        series = actual[tag]
+        np.testing.assert_array_equal(series.steps, np.asarray(steps, dtype=np.int64), err_msg=f"{tag} step")
+        np.testing.assert_array_equal(series.wall_times, np.asarray(wall_times, dtype=np.float64),
+                                      err_msg=f"{tag} wall_time")
+        np.testing.assert_array_equal(series.values, np.asarray(values, dtype=np.float32), err_msg=f"{tag} value")
+    return sum(len(steps) for steps, _, _ in expected.values())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=100000)
+    parser.add_argument("--tags", type=int, default=4)
+    parser.add_argument("--image-every", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_run(tmp, args.steps, num_tags=args.tags, image_every=args.image_every)[0]
+        print(f"文件: {os.path.getsize(path) / 1e6:.1f} MB, {args.steps} steps x {args.tags} tags")
+
+        cases = [
+            ("EventAccumulator (默认采样)", lambda: _accumulator(path)),
+            ("EventAccumulator (全部点)", lambda: _accumulator(path, {"scalars": 0})),
+            ("event_reader", lambda: {t: len(s) for t, s in read_event_scalars(path).items()}),
+            ("event_reader (CRC 校验)", lambda: {t: len(s) for t, s in read_event_scalars(path, verify_crc=True).items()}),
+            ("event_reader (仅 tag)", lambda: read_event_tags(path)),
+        ]
+        for name, fn in cases:
+            elapsed, result = _timed(fn)
+            points = sum(result.values()) if isinstance(result, dict) else len(result)
+            print(f"{name:<32} {elapsed:8.3f} s  {points} 点")
+
+        print(f"与 EventAccumulator 逐点一致 (simple_value): {check_against_accumulator(path)} 点")
+        tensor_dir = os.path.join(tmp, "tensor")
+        tensor_path = write_run(tensor_dir, args.steps, num_tags=args.tags, image_every=args.image_every,
+                                tensor_scalars=True)[0]
+        print(f"与 EventAccumulator 逐点一致 (TF2 tensor): {check_against_accumulator(tensor_path)} 点")
+
+
+if __name__ == "__main__":
+    main()
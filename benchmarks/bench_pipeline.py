@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import platform
+import tempfile
+import argparse
+import threading
+import subprocess
+from benchmarks.synthetic import write_sweep
+
+# 端到端流水线 benchmark: 逐阶段计时 (上传解包 / tag 发现 / scalar 解析 / 平滑 / 绘图 / 导出),
+# 记录吞吐量与峰值内存, 结果写成 JSON, 便于在不同提交之间对比
+#   python -m benchmarks.bench_pipeline --runs 8 --tags 8 --steps 50000 --output results/HEAD.json
+#   python -m benchmarks.bench_pipeline ... --compare results/base.json
+#
+# 每次运行使用全新的临时缓存目录, 测到的都是冷缓存耗时
+
+SAMPLE_INTERVAL = 0.01
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # 非 Linux 退化为进程历史峰值
+    return _ru_maxrss()
+
+
+# getrusage 记录的历史峰值 (字节, macOS 单位为字节, Linux 为 KB); Windows 没有 resource 模块, 返回 0
+def _ru_maxrss(who="RUSAGE_SELF"):
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(getattr(resource, who)).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# 后台线程定时采样 RSS, 得到阶段内的峰值
+class _PeakSampler:
+    def __init__(self):
+        self.peak = _rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+# 运行一个阶段, amount / unit 用于计算吞吐量
+def _stage(results, name, fn, amount_of, unit):
+    with _PeakSampler() as sampler:
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+    amount = amount_of(value)
+    results[name] = {
+        "seconds": round(elapsed, 4),
+        "amount": amount,
+        "unit": unit,
+        "throughput": round(amount / elapsed, 2) if elapsed > 0 else None,
+        "peak_rss_mb": round(sampler.peak / 2**20, 1),
+    }
+    print(f"{name:<16} {elapsed:8.3f} s  {results[name]['throughput']:>14,} {unit}/s  "
+          f"峰值 {results[name]['peak_rss_mb']:8.1f} MB")
+    return value
+
+
+def _zip_dir(src, zip_path):
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for root, _, files in os.walk(src):
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                zf.write(full, arcname=os.path.relpath(full, src))
+    return zip_path
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(args, work):
+    # 缓存目录在导入 utils 时读取, 且绘图/解析子进程会重新导入, 所以先设环境变量再导入
+    os.environ["TB_DRAW_CACHE_DIR"] = os.path.join(work, "scalar_cache")
+    os.environ["TB_DRAW_RENDER_CACHE_DIR"] = os.path.join(work, "chart_cache")
+    from utils.file_utils import upload_files
+    from utils.parallel_loader import iter_event_scalars, shutdown_pool as shutdown_parse_pool
+    from utils.plot_utils import get_all_scalars, plot_selected_scalars, export_selected_scalars
+    from utils.render import shutdown_pool as shutdown_render_pool
+    from utils.scalar_cache import load_event_scalars
+    from utils.smoothing import smooth_values
+
+    stages = {}
+    start = time.perf_counter()
+    write_sweep(os.path.join(work, "logs"), args.runs, args.steps, num_tags=args.tags,
+                image_every=args.image_every, histo_every=args.histo_every)
+    archive = _zip_dir(os.path.join(work, "logs"), os.path.join(work, "logs.zip"))
+    print(f"生成日志 {time.perf_counter() - start:.1f} s, 压缩包 {os.path.getsize(archive) / 2**20:.1f} MB")
+
+    upload_dir = None
+    try:
+        upload_dir, event_files = _stage(
+            stages, "ingest", lambda: upload_files([archive], None),
+            lambda _: round(os.path.getsize(archive) / 2**20, 2), "MB",
+        )
+        paths = [short for short, _ in event_files]
+        scalar_map = _stage(
+            stages, "tag_discovery", lambda: get_all_scalars(paths, event_files, args.workers),
+            len, "tags",
+        )
+        _stage(
+            stages, "scalar_load", lambda: dict(iter_event_scalars([full for _, full in event_files], args.workers)),
+            lambda parsed: sum(len(s) for tags in parsed.values() for s in tags.values()), "points",
+        )
+        _stage(
+            stages, "smoothing",
+            lambda: [smooth_values(load_event_scalars(full)[tag].values, args.smoothing_mode, args.smoothing)
+                     for full, tag in scalar_map.values()],
+            lambda smoothed: sum(len(v) for v in smoothed), "points",
+        )
+        keys = list(scalar_map)[:args.charts] if args.charts else list(scalar_map)
+        style = (paths, keys, {}, "", "", args.dpi, args.smoothing, {}, True, "DejaVu Sans", 12, event_files)
+        options = dict(smoothing_mode=args.smoothing_mode, max_workers=args.workers,
+                       render_workers=args.workers, decimation=args.decimation)
+        _stage(stages, "render", lambda: plot_selected_scalars(*style, **options), len, "charts")
+        # 绘图后的 PNG 导出直接复用渲染缓存; PDF 需要逐页重新绘制
+        for export_format in ("zip", "pdf"):
+            archive_path = os.path.join(work, f"export.{export_format}")
+            _stage(
+                stages, f"export_{export_format}",
+                lambda: export_selected_scalars(*style, archive_path, export_format=export_format, **options),
+                lambda count: count, "charts",
+            )
+    finally:
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        shutdown_parse_pool()
+        shutdown_render_pool()
+
+    return stages
+
+
+def _compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n对比 {baseline_path} ({baseline.get('commit')}):")
+    for name, stage in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old["seconds"]:
+            continue
+        ratio = stage["seconds"] / old["seconds"]
+        flag = "  <-- 变慢" if ratio > 1.1 else ""
+        print(f"{name:<16} {old['seconds']:8.3f} s -> {stage['seconds']:8.3f} s  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端流水线 benchmark")
+    parser.add_argument("--runs", type=int, default=4)
+    parser.add_argument("--tags", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--image-every", type=int, default=100)
+    parser.add_argument("--histo-every", type=int, default=50)
+    parser.add_argument("--charts", type=int, default=0, help="最多绘制的图数, 0 表示全部")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--smoothing", type=float, default=10, help="平滑参数: 窗口大小 / EMA 权重 / 高斯 sigma")
+    parser.add_argument("--smoothing-mode", default="moving_average")
+    parser.add_argument("--decimation", default="minmax")
+    parser.add_argument("--output", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="tb_draw_bench_")
+    try:
+        stages = run_pipeline(args, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    self_peak = _ru_maxrss("RUSAGE_SELF")
+    child_peak = _ru_maxrss("RUSAGE_CHILDREN")
+    result = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages.values()), 4),
+        "max_rss_mb": round(self_peak / 2**20, 1),
+        "max_child_rss_mb": round(child_peak / 2**20, 1),
+    }
+    print(f"合计 {result['total_seconds']:.3f} s, 主进程峰值 {result['max_rss_mb']} MB, "
+          f"子进程峰值 {result['max_child_rss_mb']} MB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    if args.compare:
+        _compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import time
+import argparse
+import numpy as np
+from utils.smoothing import moving_average, ema, gaussian, median
+
+# 对比旧版列表推导滑动平均与 utils.smoothing 各模式的耗时
+#   python -m benchmarks.bench_smoothing --points 1000000 --window 50
+
+
+# 旧实现: 每个点切片一次并调用 np.mean, O(n*w)
+def legacy_smooth(values, weight):
+    if weight <= 1:
+        return values
+    return [np.mean(values[max(0, i - weight + 1):i + 1]) for i in range(len(values))]
+
+
+def _timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--legacy-points", type=int, default=100000,
+                        help="旧实现太慢, 只在前 N 个点上计时并线性外推")
+    args = parser.parse_args()
+
+    values = np.random.default_rng(0).standard_normal(args.points).astype(np.float32)
+    legacy_n = min(args.legacy_points, args.points)
+    legacy = _timed(lambda: legacy_smooth(list(values[:legacy_n]), args.window), repeat=1)
+    legacy *= args.points / legacy_n
+
+    print(f"{args.points} 点, 窗口 {args.window}")
+    print(f"{'旧版滑动平均 (外推)':<24} {legacy:8.3f} s")
+    cases = [
+        ("moving_average", lambda: moving_average(values, args.window)),
+        ("ema (0.9)", lambda: ema(values, 0.9)),
+        ("ema (0.999)", lambda: ema(values, 0.999)),
+        ("gaussian (sigma=5)", lambda: gaussian(values, 5)),
+        ("median", lambda: median(values, args.window + 1)),
+    ]
+    for name, fn in cases:
+        elapsed = _timed(fn)
+        print(f"{name:<24} {elapsed:8.3f} s  ({legacy / elapsed:7.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import urllib.request
+
+# 启动耗时 benchmark: 基于 -X importtime 统计各模块导入耗时, 可选测量到首个 HTTP 响应的时间
+#   python -m benchmarks.bench_startup --top 15 --serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 在全新解释器中导入 module, 返回 [(模块, 自身耗时 us, 累计耗时 us)]
+def import_times(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# 启动 main.py, 轮询直到首页返回 200
+def time_to_first_request(timeout=120):
+    port = _free_port()
+    env = {**os.environ, "GRADIO_SERVER_PORT": str(port), "GRADIO_ANALYTICS_ENABLED": "False"}
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.1)
+        return None
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="gradio_ui")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--serve", action="store_true", help="同时测量启动到首个 HTTP 响应的时间")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total = max(cumulative for _, _, cumulative in rows)
+    print(f"import {args.module}: {total / 1e6:.3f} s")
+    print(f"{'模块':<48} {'累计 (s)':>10}")
+    for name, _, cumulative in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{name:<48} {cumulative / 1e6:10.3f}")
+    heavy = sorted({name.split(".")[0] for name, _, _ in rows} & {"matplotlib", "seaborn", "tensorboard", "wandb", "pandas"})
+    print(f"启动时已导入的重量级依赖: {', '.join(heavy) or '无'}")
+
+    if args.serve:
+        elapsed = time_to_first_request()
+        print(f"启动到首个 HTTP 响应: {elapsed:.3f} s" if elapsed else "启动超时")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import time
+import argparse
+import numpy as np
+from tensorboard.compat.proto.event_pb2 import Event
+from tensorboard.compat.proto.summary_pb2 import HistogramProto, Summary, SummaryMetadata
+from tensorboard.compat.proto.tensor_pb2 import TensorProto
+from tensorboard.compat.proto.types_pb2 import DT_DOUBLE, DT_FLOAT
+from tensorboard.summary.writer.event_file_writer import EventFileWriter
+
+# 生成合成 tfevents 日志, 供 benchmark 使用
+
+
+def _image_value(tag, rng, size):
+    # 随机字节充当编码后的图片, 只为模拟体积
+    return Summary.Value(tag=tag, image=Summary.Image(
+        height=size, width=size, colorspace=3,
+        encoded_image_string=rng.bytes(size * size),
+    ))
+
+
+def _histogram_value(tag, rng, num_buckets):
+    samples = rng.standard_normal(1000)
+    counts, edges = np.histogram(samples, bins=num_buckets)
+    return Summary.Value(tag=tag, histo=HistogramProto(
+        min=float(samples.min()), max=float(samples.max()), num=len(samples),
+        sum=float(samples.sum()), sum_squares=float(np.dot(samples, samples)),
+        bucket_limit=edges[1:].tolist(), bucket=counts.astype(float).tolist(),
+    ))
+
+
+# TF2 形式的 scalar: 值存为 0 维 tensor, scalars 插件元数据只在每个 tag 的第一条记录上携带
+# 偶数 tag 用 float_val (float32), 奇数 tag 用 tensor_content (float64), 覆盖两种编码
+def _tensor_value(tag, i, value, first):
+    if i % 2 == 0:
+        tensor = TensorProto(dtype=DT_FLOAT, float_val=[value])
+    else:
+        tensor = TensorProto(dtype=DT_DOUBLE, tensor_content=np.float64(value).tobytes())
+    metadata = SummaryMetadata(plugin_data=SummaryMetadata.PluginData(plugin_name="scalars")) if first else None
+    return Summary.Value(tag=tag, tensor=tensor, metadata=metadata)
+
+
+# 写出一个 run: 每步 num_tags 个 scalar, 每 image_every 步一张图片, 每 histo_every 步一个直方图
+# tensor_scalars=True 时按 TF2 的方式把 scalar 写成 tensor
+def write_run(log_dir, num_steps, num_tags=4, image_every=0, image_size=64, histo_every=0, histo_buckets=30, seed=0,
+              tensor_scalars=False):
+    rng = np.random.default_rng(seed)
+    writer = EventFileWriter(log_dir)
+    tags = [f"train/metric_{i}" for i in range(num_tags)]
+    base = time.time()
+    noise = rng.standard_normal((num_steps, num_tags)).astype(np.float32)
+    for step in range(num_steps):
+        values = []
+        for i, tag in enumerate(tags):
+            value = float(np.exp(-step / num_steps) + 0.05 * noise[step, i])
+            if tensor_scalars:
+                values.append(_tensor_value(tag, i, value, step == 0))
+            else:
+                values.append(Summary.Value(tag=tag, simple_value=value))
+        if image_every and step % image_every == 0:
+            values.append(_image_value("samples/image", rng, image_size))
+        if histo_every and step % histo_every == 0:
+            values.append(_histogram_value("weights/histogram", rng, histo_buckets))
+        writer.add_event(Event(step=step, wall_time=base + step * 0.1, summary=Summary(value=values)))
+    writer.close()
+    return [os.path.join(log_dir, name) for name in os.listdir(log_dir) if "tfevents" in name]
+
+
+# 生成 num_runs 个 run, 返回全部 event 文件路径
+def write_sweep(root, num_runs, num_steps, **kwargs):
+    paths = []
+    for run in range(num_runs):
+        paths += write_run(os.path.join(root, f"run_{run:03d}"), num_steps, seed=run, **kwargs)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成 TensorBoard 日志")
+    parser.add_argument("root")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=100000)
+    parser.add_argument("--tags", type=int, default=4)
+    parser.add_argument("--image-every", type=int, default=0)
+    parser.add_argument("--histo-every", type=int, default=0)
+    args = parser.parse_args()
+    for path in write_sweep(args.root, args.runs, args.steps, num_tags=args.tags,
+                            image_every=args.image_every, histo_every=args.histo_every):
+        print(path, os.path.getsize(path))
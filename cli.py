@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import fnmatch
+import argparse
+
+# 无界面环境下强制使用 Agg 后端
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from utils.file_utils import find_event_files
+from utils.plot_utils import get_all_scalars, plot_selected_scalars, sanitize_filename
+from utils.series import parse_x_range
+
+# 命令行批量出图, 不启动 Web 界面:
+#   python cli.py logs/ --out figures/ --tags "train/*" --runs "seed_*/*" --style style.json --jobs 8
+#
+# 样式文件 (JSON 或 YAML) 可包含:
+#   xlabel, ylabel, dpi, smoothing, smoothing_mode, decimation, show_grid, font_family, font_size,
+#   x_axis (step / relative / wall_time), x_min, x_max (与横轴同单位, 相对时间为小时),
+#   titles: {"tag (run)": "显示名称"}, colors: {"显示名称": "#FF0000"}
+
+DEFAULT_STYLE = {
+    "xlabel": "",
+    "ylabel": "",
+    "dpi": 300,
+    "smoothing": 1,
+    "smoothing_mode": "moving_average",
+    "decimation": "minmax",
+    "x_axis": "step",
+    "x_min": None,
+    "x_max": None,
+    "show_grid": True,
+    "font_family": "DejaVu Sans",
+    "font_size": 12,
+    "titles": {},
+    "colors": {},
+}
+
+
+def load_style(path):
+    if not path:
+        return dict(DEFAULT_STYLE)
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                sys.exit("读取 YAML 样式文件需要安装 PyYAML: pip install pyyaml")
+            style = yaml.safe_load(f) or {}
+        else:
+            style = json.load(f)
+    return {**DEFAULT_STYLE, **style}
+
+
+def _matches(name, patterns):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+# 输出文件名: 不同 key 清理后可能重名 (如 a/b 与 a_b), 重名时追加序号, 不互相覆盖
+def _output_names(keys):
+    names = {}
+    used = set()
+    for key in keys:
+        base = name = sanitize_filename(key)
+        n = 1
+        while name in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name)
+        names[key] = f"{name}.png"
+    return names
+
+
+# 输出比输入 (event 文件, 样式文件) 都新时视为最新, 与 make 的规则一致
+def _up_to_date(output, inputs):
+    if not os.path.exists(output):
+        return False
+    out_mtime = os.path.getmtime(output)
+    return all(os.path.getmtime(path) <= out_mtime for path in inputs if path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量绘制 TensorBoard 日志中的 scalar 曲线")
+    parser.add_argument("logdir", help="日志根目录")
+    parser.add_argument("--out", default="figures", help="输出目录 (默认 figures)")
+    parser.add_argument("--tags", nargs="+", default=["*"], help="tag 通配符, 可多个")
+    parser.add_argument("--runs", nargs="+", default=["*"], help="event 文件相对路径通配符, 可多个")
+    parser.add_argument("--style", help="JSON / YAML 样式文件")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    parser.add_argument("--force", action="store_true", help="忽略修改时间, 全部重新生成")
+    args = parser.parse_args(argv)
+
+    style = load_style(args.style)
+    event_files = [
+        (short, os.path.join(args.logdir, short))
+        for short in find_event_files(args.logdir)
+        if _matches(short, args.runs)
+    ]
+    if not event_files:
+        print(f"[警告] {args.logdir} 中没有匹配的 event 文件")
+        return 1
+
+    selected_paths = [short for short, _ in event_files]
+    scalar_map = get_all_scalars(selected_paths, event_files, args.jobs)
+    keys = [key for key, (_, tag) in scalar_map.items() if _matches(tag, args.tags)]
+
+    os.makedirs(args.out, exist_ok=True)
+    names = _output_names(keys)
+    stale = []
+    for key in keys:
+        output = os.path.join(args.out, names[key])
+        if not args.force and _up_to_date(output, [scalar_map[key][0], args.style]):
+            print(f"[跳过] {output} 已是最新")
+        else:
+            stale.append(key)
+
+    if stale:
+        titles = {key: style["titles"][key] for key in stale if key in style["titles"]}
+        rendered = plot_selected_scalars(
+            selected_paths, [titles.get(key, key) for key in stale], titles,
+            style["xlabel"], style["ylabel"], style["dpi"], style["smoothing"], style["colors"],
+            style["show_grid"], style["font_family"], style["font_size"], event_files,
+            smoothing_mode=style["smoothing_mode"], max_workers=args.jobs,
+            render_workers=args.jobs, decimation=style["decimation"],
+            x_axis=style["x_axis"], x_range=parse_x_range(style["x_min"], style["x_max"]),
+            output_dir=args.out, filenames=names,
+        )
+        for output in rendered:
+            print(f"[生成] {output}")
+        if len(rendered) < len(stale):
+            print(f"[警告] {len(stale) - len(rendered)} 张图生成失败")
+            return 1
+
+    print(f"完成: 共 {len(keys)} 张, 生成 {len(stale)} 张")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
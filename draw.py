@@ -2,13 +2,13 @@ import os
 import zipfile
 import tempfile
 import shutil
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import json
 import gradio as gr
 from matplotlib.font_manager import FontProperties, fontManager
 from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+from utils.smoothing import moving_average
 
 # 全局变量
 global_tmp_dir = None
@@ -70,13 +70,7 @@ def get_all_scalars(selected_event_paths):
     return scalar_options
 
 def smooth(values, weight):
-    if weight <= 1:
-        return values
-    smoothed = []
-    for i in range(len(values)):
-        start = max(0, i - weight + 1)
-        smoothed.append(np.mean(values[start:i+1]))
-    return smoothed
+    return moving_average(values, weight)
 
 def plot_selected_scalars(selected_paths, selected_scalars, title_map, xlabel, ylabel, dpi, smoothing, color_settings, show_grid, font_family, font_size):
     scalar_map = get_all_scalars(selected_paths)
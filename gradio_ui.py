@@ -1,30 +1,79 @@
+import os
+import re
 import json
+import tempfile
 import gradio as gr
-from utils.file_utils import upload_files, find_event_files, pack_images
-from utils.font_utils import upload_font_file, default_fonts
-from utils.plot_utils import plot_selected_scalars, get_all_scalars
+from utils.file_utils import upload_files, find_event_files, import_to_store
+from utils.scalar_store import export_store, close_stores_for
+from utils.font_utils import upload_font_file, font_choices
+from utils.plot_utils import (
+    iter_plot_selected_scalars, iter_all_scalars, plot_followed_scalars, preview_scalars,
+    iter_export_selected_scalars, iter_plot_aggregated_scalars, EXPORT_FORMATS,
+)
+from utils.aggregate import AGGREGATE_BANDS, DEFAULT_GROUP_PATTERN
+from utils.follow import LogFollower
+from utils.parallel_loader import DEFAULT_WORKERS
+from utils.smoothing import SMOOTHING_MODES, SMOOTHING_SLIDERS
+from utils.decimation import DECIMATION_MODES
+from utils.session import SESSION_TTL, ensure_session, close_session, release_follow_dir
+from utils.scheduler import stage_kwargs
+from utils.tag_index import TagIndex, SEARCH_MODES, GROUP_MODES, TABLE_HEADERS
+from utils.metrics import traced, current_trace, TIMING_HEADERS
+from utils.series import X_AXES, X_AXIS_LABELS, parse_x_range
 
 
-global_tmp_dir = None
-global_event_files = []
-
 def build_ui():
     with gr.Blocks(title="TB 可视化工具", theme=gr.themes.Soft()) as tensor_board:
         gr.Markdown("""<h1 style='font-family: "Segoe UI", sans-serif;'>🧪 TensorBoard 可视化工具</h1>""")
 
         with gr.Row():
-            files = gr.File(file_types=[".zip", ".event"], label="上传日志", file_count="multiple")
+            files = gr.File(file_types=[".zip", ".event", ".tar", ".gz", ".tgz"], label="上传日志", file_count="multiple")
+            local_dir_input = gr.Textbox(label="或填写服务器本地日志目录 (原地读取)")
             upload_btn = gr.Button("📦 解压或加载文件")
 
-        event_selector = gr.CheckboxGroup(label="选择 event 文件", choices=[])
-        scalar_selector = gr.CheckboxGroup(label="选择 Scalars", choices=[])
-        update_scalar_btn = gr.Button("📥 更新 Scalar 列表")
+        with gr.Row():
+            build_store_btn = gr.Button("🗃️ 建立列式索引")
+            export_store_btn = gr.Button("📤 导出索引")
+        store_download = gr.File(label="下载索引 (可直接作为日志上传)", visible=False)
 
-        scalar_textboxes = [
-            gr.Textbox(label=f"Scalar {i+1}", visible=False) for i in range(30)
-        ]
+        with gr.Accordion("📡 实时跟踪本地日志目录", open=False):
+            with gr.Row():
+                follow_dir_input = gr.Textbox(label="日志目录 (服务器本地路径)")
+                follow_interval_input = gr.Number(label="刷新间隔 (秒)", value=5, minimum=1)
+            with gr.Row():
+                follow_start_btn = gr.Button("▶️ 开始跟踪")
+                follow_stop_btn = gr.Button("⏹️ 停止跟踪")
+            follow_timer = gr.Timer(5, active=False)
+
+        # 每个用户独立的上传状态, 过期或关闭页面后清理上传目录
+        session_state = gr.State(None, time_to_live=SESSION_TTL, delete_callback=close_session)
+        follower_state = gr.State(None)
+        follow_charts_state = gr.State(None)
+
+        event_selector = gr.CheckboxGroup(label="选择 event 文件", choices=[])
+        with gr.Row():
+            update_scalar_btn = gr.Button("📥 更新 Scalar 列表")
+            workers_input = gr.Slider(1, max(DEFAULT_WORKERS, 2), value=DEFAULT_WORKERS, step=1, label="并行进程数")
 
-        update_titles_btn = gr.Button("🔄 更新显示名称")
+        # scalar 目录: 搜索和分页在服务端完成, 表格只显示当前页
+        with gr.Row():
+            scalar_search_input = gr.Textbox(label="搜索 Scalar (回车)", placeholder="train/  或  loss$  或  trnlss")
+            search_mode_input = gr.Radio(label="搜索方式", choices=list(SEARCH_MODES.items()), value="prefix")
+            group_by_input = gr.Radio(label="排列", choices=list(GROUP_MODES.items()), value="none")
+        with gr.Row():
+            prev_page_btn = gr.Button("◀ 上一页")
+            page_input = gr.Number(label="页码", value=1, minimum=1, precision=0)
+            next_page_btn = gr.Button("下一页 ▶")
+            page_size_input = gr.Dropdown(label="每页条数", choices=[20, 50, 100, 200], value=50)
+        with gr.Row():
+            select_hits_btn = gr.Button("☑️ 选中全部搜索结果")
+            clear_hits_btn = gr.Button("⬜ 取消选中搜索结果")
+        catalog_status = gr.Markdown()
+        scalar_table = gr.Dataframe(
+            headers=TABLE_HEADERS, datatype=["bool", "str", "str", "str"], type="array",
+            col_count=(len(TABLE_HEADERS), "fixed"), row_count=(0, "fixed"), static_columns=[2, 3],
+            interactive=True, label="Scalars (勾选要绘制的曲线, 可直接修改显示名称)",
+        )
 
         color_picker_group = gr.Textbox(label="曲线颜色映射（JSON格式）", lines=6)
 
@@ -32,98 +81,395 @@ def build_ui():
             xlabel_input = gr.Textbox(label="横坐标标题")
             ylabel_input = gr.Textbox(label="纵坐标标题")
 
+        # 横轴范围与所选横轴同单位 (相对时间为小时, 墙钟时间为 Unix 时间戳), 留空表示不限
         with gr.Row():
-            font_selector = gr.Dropdown(label="选择字体", choices=default_fonts, value="Segoe UI")
+            x_axis_input = gr.Dropdown(label="横轴", choices=list(X_AXES.items()), value="step")
+            x_min_input = gr.Number(label="横轴起点 (留空不限)", value=None)
+            x_max_input = gr.Number(label="横轴终点 (留空不限)", value=None)
+
+        with gr.Row():
+            font_selector = gr.Dropdown(label="选择字体", choices=font_choices(), value="Segoe UI")
             font_size_selector = gr.Dropdown(label="字体大小", choices=[str(s) for s in [8,10,12,14,16,18,20,24]], value="12")
-            font_upload = gr.File(file_types=[".ttf"], label="上传字体")
+            font_upload = gr.File(file_types=[".ttf", ".otf"], label="上传字体")
 
-        smoothing_input = gr.Slider(1, 50, value=1, step=1, label="平滑窗口大小")
-        dpi_input = gr.Slider(50, 600, value=100, step=10, label="输出图像 DPI")
+        with gr.Row():
+            smoothing_mode_input = gr.Dropdown(
+                label="平滑方式", choices=list(SMOOTHING_MODES.items()), value="moving_average"
+            )
+            smoothing_input = gr.Slider(**SMOOTHING_SLIDERS["moving_average"])
+        with gr.Row():
+            dpi_input = gr.Slider(50, 600, value=100, step=10, label="输出图像 DPI")
+            decimation_input = gr.Dropdown(
+                label="降采样 (点数上限随图宽与 DPI 变化)", choices=list(DECIMATION_MODES.items()), value="minmax"
+            )
         show_grid_checkbox = gr.Checkbox(label="显示网格线", value=True)
 
-        plot_btn = gr.Button("🎨 绘制曲线图")
-        pack_btn = gr.Button("🗜️ 打包所有图片")
+        with gr.Row():
+            preview_btn = gr.Button("👁️ 交互式预览")
+            live_preview_checkbox = gr.Checkbox(label="调整平滑参数时自动刷新预览", value=True)
+        preview_plot = gr.LinePlot(
+            x="x", y="value", color="scalar", label="交互式预览 (降采样数据, 在浏览器中缩放)", height=400
+        )
+
+        plot_btn = gr.Button("🎨 绘制曲线图 (按所选 DPI 导出 PNG)")
+        with gr.Row():
+            export_format_input = gr.Dropdown(label="导出格式", choices=list(EXPORT_FORMATS.items()), value="zip")
+            export_btn = gr.Button("🗜️ 导出所有图片")
+
+        with gr.Accordion("🌱 多 run 聚合 (同一配置的多个 seed 画成中心线 + 阴影带)", open=False):
+            with gr.Row():
+                group_pattern_input = gr.Textbox(
+                    label="分组正则 (目录中匹配的部分视为 seed, 其余部分相同的 run 归为一组)",
+                    value=DEFAULT_GROUP_PATTERN,
+                )
+                band_input = gr.Dropdown(label="阴影带", choices=list(AGGREGATE_BANDS.items()), value="std")
+            aggregate_btn = gr.Button("📊 绘制聚合曲线")
 
         output_gallery = gr.Gallery(label="绘图结果", columns=2, height="600px")
-        zip_download = gr.File(label="下载zip", visible=False)
+        export_download = gr.File(label="下载导出文件", visible=False)
 
-        def handle_upload(files_):
-            global global_tmp_dir, global_event_files
-            global_tmp_dir, global_event_files = upload_files(files_, global_tmp_dir)
-            return gr.update(choices=[f"./{short}" for short, _ in global_event_files])
+        # 最近一次请求的各阶段耗时; 所有请求的累计值见 /metrics 端点
+        with gr.Accordion("⏱️ 耗时统计", open=False):
+            timing_table = gr.Dataframe(headers=TIMING_HEADERS, type="array", interactive=False)
 
-        upload_btn.click(handle_upload, inputs=[files], outputs=[event_selector])
+        def show_timings(session):
+            if session is None or session.last_trace is None:
+                return []
+            return session.last_trace.rows()
 
-        font_upload.change(lambda f: gr.update(choices=upload_font_file(f)[0], value=upload_font_file(f)[1]),
-                           inputs=[font_upload], outputs=[font_selector])
+        @traced("upload")
+        def handle_upload(files_, local_dir, session):
+            session = ensure_session(session)
+            session.last_trace = current_trace()
+            sources = list(files_ or [])
+            if local_dir and local_dir.strip():
+                if not os.path.isdir(local_dir.strip()):
+                    raise gr.Error(f"目录不存在: {local_dir}")
+                sources.append(local_dir.strip())
+            previous = session.event_files
+            try:
+                session.tmp_dir, session.event_files = upload_files(sources, session.tmp_dir)
+            except (ValueError, OSError) as e:
+                raise gr.Error(str(e))
+            close_stores_for(previous)
+            session.store_dir = None
+            return gr.update(choices=[f"./{short}" for short, _ in session.event_files]), session
 
-        def update_scalar_choices(selected_files):
-            selected_paths = [f.lstrip("./") for f in selected_files]
-            scalar_options = get_all_scalars(selected_paths, global_event_files)
-            options = list(scalar_options.keys())
+        upload_btn.click(
+            handle_upload, inputs=[files, local_dir_input, session_state],
+            outputs=[event_selector, session_state], **stage_kwargs("ingest")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+
+        # 解析一次, 之后列 tag 和绘图都从 mmap 的列式存储读取
+        @traced("build_store")
+        def handle_build_store(max_workers, session):
+            if session is None or not session.event_files:
+                raise gr.Error("请先上传日志")
+            session.last_trace = current_trace()
+            previous = session.event_files
+            session.store_dir, session.event_files = import_to_store(
+                session.event_files, session.tmp_dir, int(max_workers)
+            )
+            close_stores_for(previous)
+            gr.Info(f"已建立索引: {len(session.event_files)} 个 event 文件")
+            return session
+
+        def handle_export_store(session):
+            if session is None or not session.store_dir:
+                raise gr.Error("请先建立列式索引")
+            archive = tempfile.NamedTemporaryFile(delete=False, suffix='.tbstore.zip', dir=session.tmp_dir)
+            archive.close()
+            return gr.update(value=export_store(session.store_dir, archive.name), visible=True)
+
+        build_store_btn.click(
+            handle_build_store, inputs=[workers_input, session_state], outputs=[session_state],
+            **stage_kwargs("ingest")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+        export_store_btn.click(
+            handle_export_store, inputs=[session_state], outputs=[store_download], **stage_kwargs("ingest")
+        )
+
+        # 每次上传只登记一次字体, 清空上传框时保持当前选择
+        def handle_font_upload(font_file):
+            if font_file is None:
+                return gr.update()
+            try:
+                choices, font_name = upload_font_file(font_file)
+            except ValueError as e:
+                raise gr.Error(str(e))
+            return gr.update(choices=choices, value=font_name)
+
+        font_upload.change(handle_font_upload, inputs=[font_upload], outputs=[font_selector])
+
+        smoothing_mode_input.change(
+            lambda mode: gr.update(**SMOOTHING_SLIDERS[mode]),
+            inputs=[smoothing_mode_input], outputs=[smoothing_input]
+        )
+
+        # 当前页的表格、搜索状态与页码
+        def render_catalog(query, mode, group_by, page, page_size, session):
+            session = ensure_session(session)
+            catalog = session.catalog
+            if catalog is None:
+                return gr.update(value=[]), "尚未建立 Scalar 列表", 1, session
+            try:
+                hits = catalog.search(query, mode)
+            except re.error as e:
+                raise gr.Error(f"正则无效: {e}")
+            rows, total_pages, page = catalog.page(hits, group_by, page, page_size)
+            status = (f"共 {len(catalog)} 个 scalar, 匹配 {len(hits)} 个, 第 {page} / {total_pages} 页, "
+                      f"已选 {len(catalog.selected)} 个")
+            return rows, status, page, session
 
-            textbox_updates = []
-            for i in range(30):
-                if i < len(options):
-                    textbox_updates.append(gr.update(value=options[i], visible=True))
-                else:
-                    textbox_updates.append(gr.update(visible=False))
+        @traced("scalar_list")
+        def update_scalar_choices(selected_files, max_workers, query, mode, group_by, page_size, session):
+            session = ensure_session(session)
+            session.last_trace = current_trace()
+            selected_paths = [f.lstrip("./") for f in selected_files]
+            # 每解析完一个文件就刷新一次进度, 全部完成后建立索引
+            scalar_options = {}
+            for scalar_options in iter_all_scalars(selected_paths, session.event_files, int(max_workers)):
+                yield gr.update(), f"正在读取 tag: 已发现 {len(scalar_options)} 个 scalar", gr.update(), session
+            session.catalog = TagIndex(scalar_options, previous=session.catalog)
+            yield render_catalog(query, mode, group_by, 1, page_size, session)
 
-            return gr.update(choices=options, value=options), *textbox_updates
+        catalog_inputs = [scalar_search_input, search_mode_input, group_by_input, page_input, page_size_input,
+                          session_state]
+        catalog_outputs = [scalar_table, catalog_status, page_input, session_state]
 
         update_scalar_btn.click(
             update_scalar_choices,
-            inputs=[event_selector],
-            outputs=[scalar_selector] + scalar_textboxes
+            inputs=[event_selector, workers_input, scalar_search_input, search_mode_input, group_by_input,
+                    page_size_input, session_state],
+            outputs=catalog_outputs,
+            **stage_kwargs("parse")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+
+        # 新的搜索条件从第一页开始
+        def search_catalog(query, mode, group_by, page, page_size, session):
+            return render_catalog(query, mode, group_by, 1, page_size, session)
+
+        for trigger in (scalar_search_input.submit, search_mode_input.input, group_by_input.input,
+                        page_size_input.input):
+            trigger(search_catalog, inputs=catalog_inputs, outputs=catalog_outputs)
+        page_input.submit(render_catalog, inputs=catalog_inputs, outputs=catalog_outputs)
+        prev_page_btn.click(
+            lambda q, m, g, p, n, s: render_catalog(q, m, g, (p or 1) - 1, n, s),
+            inputs=catalog_inputs, outputs=catalog_outputs,
+        )
+        next_page_btn.click(
+            lambda q, m, g, p, n, s: render_catalog(q, m, g, (p or 1) + 1, n, s),
+            inputs=catalog_inputs, outputs=catalog_outputs,
         )
 
-        def sync_checkbox_names(*args):
-            names = [name for name in args if name and name.strip()]
-            return gr.update(choices=names, value=names)
+        # 表格中的勾选与改名立即写回索引
+        def apply_table_edits(rows, session):
+            session = ensure_session(session)
+            if session.catalog is not None and rows:
+                session.catalog.apply_rows(rows)
+            return session
+
+        scalar_table.input(apply_table_edits, inputs=[scalar_table, session_state], outputs=[session_state])
+
+        def select_hits(checked):
+            def handler(query, mode, group_by, page, page_size, session):
+                session = ensure_session(session)
+                if session.catalog is not None:
+                    try:
+                        session.catalog.select(session.catalog.search(query, mode), checked)
+                    except re.error as e:
+                        raise gr.Error(f"正则无效: {e}")
+                return render_catalog(query, mode, group_by, page, page_size, session)
+            return handler
 
-        update_titles_btn.click(sync_checkbox_names, inputs=scalar_textboxes, outputs=[scalar_selector])
+        select_hits_btn.click(select_hits(True), inputs=catalog_inputs, outputs=catalog_outputs)
+        clear_hits_btn.click(select_hits(False), inputs=catalog_inputs, outputs=catalog_outputs)
 
-        def start_plot(selected_files, selected_scalars, xlabel, ylabel, dpi, smoothing,
-                       title_names_list, color_json, show_grid, font_family, font_size_str):
+        # 整理绘图按钮的输入, 选中的 scalar 与显示名称来自会话中的索引; 返回 (会话, 位置参数, 关键字参数)
+        def plot_request(selected_files, xlabel, ylabel, dpi, smoothing, color_json, show_grid, font_family,
+                         font_size_str, smoothing_mode, max_workers, decimation, x_axis, x_min, x_max,
+                         table_rows, session):
+            session = apply_table_edits(table_rows, session)
             selected_paths = [f.lstrip("./") for f in selected_files]
 
-            title_map = {
-                original: edited
-                for original, edited in zip(selected_scalars, title_names_list[:len(selected_scalars)])
-                if edited and edited.strip()
-            }
+            catalog = session.catalog
+            selected_scalars = catalog.selected_scalars() if catalog is not None else []
+            title_map = catalog.title_map() if catalog is not None else {}
 
             color_map = json.loads(color_json) if color_json else {}
 
-            return plot_selected_scalars(
+            positional = (
                 selected_paths, selected_scalars, title_map,
                 xlabel, ylabel, dpi, smoothing, color_map,
-                show_grid, font_family, int(font_size_str), global_event_files
+                show_grid, font_family, int(font_size_str), session.event_files,
             )
+            options = dict(
+                smoothing_mode=smoothing_mode, max_workers=int(max_workers),
+                render_workers=int(max_workers), decimation=decimation,
+                x_axis=x_axis, x_range=parse_x_range(x_min, x_max),
+            )
+            return session, positional, options
+
+        @traced("plot")
+        def plot_handler(*args):
+            session, positional, options = plot_request(*args)
+            session.last_trace = current_trace()
+            # 每画完一张图就刷新画廊, 同时回写会话, 刷新其过期时间
+            for paths in iter_plot_selected_scalars(*positional, **options):
+                yield paths, session
+
+        # 导出: 直接渲染进压缩包 / 多页 PDF, 最后一张图完成时文件即可下载
+        @traced("export")
+        def export_handler(*args, progress=gr.Progress()):
+            session, positional, options = plot_request(*args[:-1])
+            session.last_trace = current_trace()
+            export_format = args[-1]
+            suffix = ".pdf" if export_format == "pdf" else ".zip"
+            archive = tempfile.NamedTemporaryFile(delete=False, prefix="charts_", suffix=suffix, dir=session.tmp_dir)
+            archive.close()
+            for done, total in iter_export_selected_scalars(
+                *positional, archive.name, export_format=export_format, **options
+            ):
+                progress((done, total), desc="导出中")
+            return gr.update(value=archive.name, visible=True), session
+
+        # 聚合绘图按 tag 出图, 显示名称只用于找回原始 scalar
+        @traced("aggregate")
+        def aggregate_handler(*args):
+            session, positional, options = plot_request(*args[:-2])
+            session.last_trace = current_trace()
+            group_pattern, band = args[-2:]
+            try:
+                re.compile(group_pattern or "")
+            except re.error as e:
+                raise gr.Error(f"分组正则无效: {e}")
+            (selected_paths, selected_scalars, title_map, xlabel, ylabel, dpi, smoothing, color_map,
+             show_grid, font_family, font_size, event_files) = positional
+            reverse_title_map = {v: k for k, v in title_map.items()}
+            options.pop("decimation")
+            for paths in iter_plot_aggregated_scalars(
+                selected_paths, [reverse_title_map.get(name, name) for name in selected_scalars],
+                xlabel, ylabel, dpi, smoothing, color_map, show_grid, font_family, font_size, event_files,
+                group_pattern=group_pattern, band=band, **options,
+            ):
+                yield paths, session
+
+        plot_inputs = [
+            event_selector, xlabel_input, ylabel_input, dpi_input, smoothing_input,
+            color_picker_group, show_grid_checkbox, font_selector, font_size_selector,
+            smoothing_mode_input, workers_input, decimation_input, x_axis_input, x_min_input, x_max_input,
+            scalar_table, session_state
+        ]
 
         plot_btn.click(
-            lambda *args: start_plot(
-                args[0],  # selected_files
-                args[1],  # selected_scalars
-                args[2],  # xlabel
-                args[3],  # ylabel
-                args[4],  # dpi
-                args[5],  # smoothing
-                args[6:36],  # title_names_list (scalar_textboxes: 30 个)
-                args[36],  # color_json
-                args[37],  # show_grid
-                args[38],  # font_family
-                args[39],  # font_size_str
-            ),
-            inputs=[
-                event_selector, scalar_selector, xlabel_input, ylabel_input,
-                dpi_input, smoothing_input, *scalar_textboxes,  # 30 个输入框
-                color_picker_group, show_grid_checkbox, font_selector, font_size_selector
-            ],
-            outputs=[output_gallery]
-        )
+            plot_handler, inputs=plot_inputs, outputs=[output_gallery, session_state], **stage_kwargs("render")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+        aggregate_btn.click(
+            aggregate_handler, inputs=[*plot_inputs, group_pattern_input, band_input],
+            outputs=[output_gallery, session_state], **stage_kwargs("render")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+        export_btn.click(
+            export_handler, inputs=[*plot_inputs, export_format_input], outputs=[export_download, session_state],
+            **stage_kwargs("render")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+
+        # 预览只发送降采样后的数据, 不在服务端绘图
+        @traced("preview")
+        def preview_handler(selected_files, smoothing, smoothing_mode, decimation,
+                            color_json, xlabel, ylabel, max_workers, x_axis, x_min, x_max, table_rows, session):
+            session = apply_table_edits(table_rows, session)
+            session.last_trace = current_trace()
+            selected_paths = [f.lstrip("./") for f in selected_files]
+            catalog = session.catalog
+            selected_scalars = catalog.selected_scalars() if catalog is not None else []
+            title_map = catalog.title_map() if catalog is not None else {}
+            color_map = json.loads(color_json) if color_json else {}
+            frame, colors = preview_scalars(
+                selected_paths, selected_scalars, title_map, smoothing, color_map, session.event_files,
+                smoothing_mode=smoothing_mode, max_workers=int(max_workers), decimation=decimation,
+                x_axis=x_axis, x_range=parse_x_range(x_min, x_max),
+            )
+            plot = gr.LinePlot(
+                value=frame, color_map=colors, x_title=xlabel or X_AXIS_LABELS[x_axis], y_title=ylabel or "Value"
+            )
+            return plot, session
+
+        def live_preview_handler(live, *args):
+            if not live:
+                return gr.update(), args[-1]
+            return preview_handler(*args)
+
+        preview_inputs = [
+            event_selector, smoothing_input, smoothing_mode_input, decimation_input,
+            color_picker_group, xlabel_input, ylabel_input, workers_input, x_axis_input, x_min_input, x_max_input,
+            scalar_table, session_state
+        ]
+        preview_btn.click(
+            preview_handler, inputs=preview_inputs, outputs=[preview_plot, session_state], **stage_kwargs("parse")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+        # 平滑参数或横轴变化时重新计算, 滑块只在松开时触发
+        for trigger in (smoothing_input.release, smoothing_mode_input.input, x_axis_input.input):
+            trigger(
+                live_preview_handler, inputs=[live_preview_checkbox, *preview_inputs],
+                outputs=[preview_plot, session_state], **stage_kwargs("parse")
+            ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
+
+        # 跟踪模式: 定时读取新增记录, 只重绘有变化的图; 跟踪目录的 scalar 写入会话的索引
+        def start_follow(log_dir, interval, session):
+            if not log_dir or not os.path.isdir(log_dir):
+                raise gr.Error(f"日志目录不存在: {log_dir}")
+            session = ensure_session(session)
+            follower = LogFollower(log_dir)
+            follower.poll()
+            session.catalog = TagIndex(follower.scalar_options())
+            release_follow_dir(session)
+            session.follow_dir = tempfile.mkdtemp(prefix="tb_follow_")
+            charts = {"dir": session.follow_dir, "paths": {}}
+            return follower, charts, gr.Timer(value=max(1, interval or 5), active=True), session
 
-        pack_btn.click(pack_images, inputs=[output_gallery], outputs=[zip_download])
-        pack_btn.click(lambda: gr.update(visible=True), outputs=[zip_download])
+        @traced("follow")
+        def follow_tick(follower, charts, xlabel, ylabel, dpi, smoothing,
+                        color_json, show_grid, font_family, font_size_str, smoothing_mode, max_workers,
+                        decimation, x_axis, x_min, x_max, session):
+            if follower is None or session is None or session.catalog is None:
+                return gr.update(), gr.update(), session
+            session.last_trace = current_trace()
+            follower.poll()
+            status_update = gr.update()
+            added = session.catalog.add(follower.scalar_options())
+            if added:
+                status_update = f"跟踪中: 新增 {len(added)} 个 scalar, 共 {len(session.catalog)} 个, 可在列表中勾选"
+
+            color_map = json.loads(color_json) if color_json else {}
+            paths = plot_followed_scalars(
+                follower, list(session.catalog.selected), charts["paths"], charts["dir"],
+                xlabel, ylabel, dpi, smoothing, color_map,
+                show_grid, font_family, int(font_size_str),
+                smoothing_mode=smoothing_mode, render_workers=int(max_workers), decimation=decimation,
+                x_axis=x_axis, x_range=parse_x_range(x_min, x_max),
+            )
+            return paths, status_update, session
+
+        follow_inputs = [
+            follower_state, follow_charts_state, xlabel_input, ylabel_input,
+            dpi_input, smoothing_input, color_picker_group, show_grid_checkbox,
+            font_selector, font_size_selector, smoothing_mode_input, workers_input, decimation_input,
+            x_axis_input, x_min_input, x_max_input, session_state
+        ]
+        follow_outputs = [output_gallery, catalog_status, session_state]
+
+        follow_start_btn.click(
+            start_follow,
+            inputs=[follow_dir_input, follow_interval_input, session_state],
+            outputs=[follower_state, follow_charts_state, follow_timer, session_state]
+        ).then(
+            search_catalog, inputs=catalog_inputs, outputs=catalog_outputs
+        ).then(follow_tick, inputs=follow_inputs, outputs=follow_outputs, **stage_kwargs("render")).then(
+            show_timings, inputs=[session_state], outputs=[timing_table], show_api=False
+        )
+        follow_stop_btn.click(lambda: gr.Timer(active=False), outputs=[follow_timer])
+        follow_timer.tick(
+            follow_tick, inputs=follow_inputs, outputs=follow_outputs, **stage_kwargs("render")
+        ).then(show_timings, inputs=[session_state], outputs=[timing_table], show_api=False)
 
     return tensor_board
@@ -1,6 +1,14 @@
+import threading
 from gradio_ui import build_ui
-from wandb import tensorboard
+from utils.render import warm_up
+from utils import render_cache
+from utils.metrics import start_metrics_server
 
 if __name__ == "__main__":
     tensorboard_draw = build_ui()
-    tensorboard_draw.launch()
+    # 渲染缓存默认在 ~/.cache 下, 需显式允许 Gradio 返回其中的图片
+    tensorboard_draw.launch(prevent_thread_lock=True, allowed_paths=[render_cache.CACHE_DIR])
+    # 界面已可访问, 再在后台预热绘图依赖
+    threading.Thread(target=warm_up, daemon=True).start()
+    start_metrics_server()
+    tensorboard_draw.block_thread()
@@ -0,0 +1,76 @@
+import os
+import re
+import numpy as np
+
+# 多 run 聚合: 同一配置的多个 seed 对齐到公共 step 网格后求统计量, 画成均值线 + 阴影带
+
+# 阴影带: 下拉框显示名 -> 内部名
+AGGREGATE_BANDS = {
+    "均值 ± 标准差": "std",
+    "中位数 + 25%~75% 分位": "iqr",
+    "均值 + 最小/最大": "minmax",
+}
+
+DEFAULT_GROUP_PATTERN = r"seed[_-]?\d+"
+
+
+# 按 event 文件所在目录分组: 目录中匹配 pattern 的部分替换为 *, 替换后相同的 run 归为一组
+#   run_paths: [event 文件相对路径]; 返回 {组名: [相对路径, ...]}, 保持输入顺序
+def group_runs(run_paths, pattern=DEFAULT_GROUP_PATTERN):
+    regex = re.compile(pattern) if pattern else None
+    groups = {}
+    for path in run_paths:
+        run_dir = os.path.dirname(path).replace(os.sep, "/") or "."
+        name = regex.sub("*", run_dir) if regex else run_dir
+        groups.setdefault(name, []).append(path)
+    return groups
+
+
+# step 排序去重 (断点续训时同一 step 出现多次, 保留最后写入的值)
+def _monotonic(steps, values):
+    steps = np.asarray(steps)
+    values = np.asarray(values, dtype=np.float64)
+    if steps.size > 1 and np.all(steps[1:] > steps[:-1]):
+        return steps, values
+    order = np.argsort(steps, kind="stable")[::-1]
+    unique_steps, first = np.unique(steps[order], return_index=True)
+    return unique_steps, values[order[first]]
+
+
+# 把各 run 线性插值到公共网格, 返回 (grid, matrix); matrix 形状为 (run 数, 网格点数), 超出某 run 范围处为 NaN
+def align_runs(series, n_points):
+    series = [_monotonic(steps, values) for steps, values in series if len(steps)]
+    if not series:
+        return np.empty(0), np.empty((0, 0))
+    lo = min(steps[0] for steps, _ in series)
+    hi = max(steps[-1] for steps, _ in series)
+    grid = np.linspace(lo, hi, max(2, int(n_points)))
+    matrix = np.empty((len(series), grid.size))
+    # 每个 run 一次 np.interp (C 实现), 没有逐点的 Python 循环
+    for row, (steps, values) in zip(matrix, series):
+        row[:] = np.interp(grid, steps, values, left=np.nan, right=np.nan)
+    return grid, matrix
+
+
+# 沿 run 维度归约, 返回 (中心线, 下界, 上界, 每个网格点的有效 run 数)
+def reduce_runs(matrix, band="std"):
+    valid = ~np.isnan(matrix)
+    count = valid.sum(axis=0)
+    covered = count > 0
+    center = np.full(matrix.shape[1], np.nan)
+    lower = np.full(matrix.shape[1], np.nan)
+    upper = np.full(matrix.shape[1], np.nan)
+    m = matrix[:, covered]
+    if band == "iqr":
+        center[covered], lower[covered], upper[covered] = np.nanquantile(m, [0.5, 0.25, 0.75], axis=0)
+    elif band == "minmax":
+        center[covered] = np.nanmean(m, axis=0)
+        lower[covered] = np.nanmin(m, axis=0)
+        upper[covered] = np.nanmax(m, axis=0)
+    elif band == "std":
+        mean = np.nanmean(m, axis=0)
+        std = np.nanstd(m, axis=0)
+        center[covered], lower[covered], upper[covered] = mean, mean - std, mean + std
+    else:
+        raise ValueError(f"未知的聚合方式: {band}")
+    return center, lower, upper, count
@@ -0,0 +1,96 @@
+import numpy as np
+from utils.metrics import stage
+
+# 降采样方式: 下拉框显示名 -> 内部名
+DECIMATION_MODES = {
+    "不降采样": "none",
+    "最小/最大包络": "minmax",
+    "LTTB": "lttb",
+}
+
+
+# 输出点数上限: 图宽 (英寸) x dpi 即横向像素数, 每个像素列最多保留两个点
+def point_budget(dpi, figsize):
+    return max(16, 2 * int(figsize[0] * dpi))
+
+
+# Largest-Triangle-Three-Buckets, 返回保留点的下标
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # 除首尾两点外分成 n_out - 2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x, edges[:-1]) / counts
+    avg_y = np.add.reduceat(y, edges[:-1]) / counts
+    # 每个桶的参考点是下一个桶的均值, 最后一个桶用末尾点
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    # 选点依赖上一个桶的结果, 只能逐桶循环; 桶内计算是向量化的
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+# 按 x 等宽分桶, 每桶保留最小值和最大值所在的点, 尖峰不会丢失; 返回升序下标
+def minmax_indices(x, y, n_buckets):
+    n = len(x)
+    if n <= 2 * n_buckets + 2 or n_buckets < 1:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y)
+
+    if np.all(x[1:] >= x[:-1]):
+        edges = np.linspace(x[0], x[-1], n_buckets + 1)
+        starts = np.unique(np.searchsorted(x, edges[:-1], side="left"))
+        starts = starts[starts < n]
+    else:
+        # step 不单调 (例如断点续训), 退化为按下标等分
+        starts = np.unique(np.linspace(0, n, n_buckets, endpoint=False).astype(np.int64))
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    counts = np.diff(np.append(starts, n))
+
+    # 每桶中第一个等于最小/最大值的位置
+    min_pos = np.flatnonzero(y == np.repeat(mins, counts))
+    max_pos = np.flatnonzero(y == np.repeat(maxs, counts))
+    min_idx = min_pos[np.searchsorted(min_pos, starts)]
+    max_idx = max_pos[np.searchsorted(max_pos, starts)]
+    return np.unique(np.concatenate(([0, n - 1], min_idx, max_idx)))
+
+
+# 降采样入口, 返回 (x, y); 非有限值先剔除
+def decimate(x, y, mode, budget):
+    if mode == "none" or len(x) <= budget:
+        return x, y
+    with stage("decimate") as record:
+        record.points = len(x)
+        return _decimate(x, y, mode, budget)
+
+
+def _decimate(x, y, mode, budget):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    if mode == "lttb":
+        idx = lttb_indices(x, y, budget)
+    elif mode == "minmax":
+        idx = minmax_indices(x, y, budget // 2)
+    else:
+        raise ValueError(f"未知的降采样方式: {mode}")
+    return x[idx], y[idx]
@@ -0,0 +1,266 @@
+import mmap
+import struct
+from array import array
+import numpy as np
+from utils.series import ScalarSeries
+
+# 直接扫描 TFRecord 帧, 只解码 scalar, 不经过 EventAccumulator
+#
+# 单条记录格式 (小端):
+#   uint64 length | uint32 masked_crc(length) | data[length] | uint32 masked_crc(data)
+# data 是 Event protobuf, 这里手工解析 wire format, 遇到图片/直方图/graph 等直接按长度跳过
+
+_HEADER = struct.Struct("<QI")
+_DOUBLE = struct.Struct("<d")
+_FLOAT = struct.Struct("<f")
+
+# TensorProto.dtype
+_DT_FLOAT = 1
+_DT_DOUBLE = 2
+# SummaryMetadata.data_class
+_DATA_CLASS_SCALAR = 1
+
+
+def _read_varint(buf, pos):
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    result = b & 0x7F
+    shift = 7
+    pos += 1
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip_field(buf, pos, wire_type):
+    if wire_type == 0:
+        _, pos = _read_varint(buf, pos)
+        return pos
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if wire_type == 5:
+        return pos + 4
+    raise ValueError(f"不支持的 protobuf wire type: {wire_type}")
+
+
+# SummaryMetadata -> 是否为 scalar 插件
+def _is_scalar_metadata(buf, pos, end):
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        if key == 0x0A:  # plugin_data
+            length, pos = _read_varint(buf, pos)
+            sub_end = pos + length
+            while pos < sub_end:
+                sub_key, pos = _read_varint(buf, pos)
+                if sub_key == 0x0A:  # plugin_name
+                    name_len, pos = _read_varint(buf, pos)
+                    if bytes(buf[pos:pos + name_len]) == b"scalars":
+                        return True
+                    pos += name_len
+                else:
+                    pos = _skip_field(buf, pos, sub_key & 7)
+        elif key == 0x20:  # data_class
+            data_class, pos = _read_varint(buf, pos)
+            if data_class == _DATA_CLASS_SCALAR:
+                return True
+        else:
+            pos = _skip_field(buf, pos, key & 7)
+    return False
+
+
+# TensorProto -> 标量值, 非 float/double 标量返回 None
+def _tensor_scalar(buf, pos, end):
+    dtype = 0
+    content = None
+    value = None
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        if key == 0x08:  # dtype
+            dtype, pos = _read_varint(buf, pos)
+        elif key == 0x22:  # tensor_content
+            length, pos = _read_varint(buf, pos)
+            content = (pos, length)
+            pos += length
+        elif key == 0x2D:  # float_val (非 packed)
+            value = _FLOAT.unpack_from(buf, pos)[0]
+            pos += 4
+        elif key == 0x2A:  # float_val (packed)
+            length, pos = _read_varint(buf, pos)
+            if length >= 4:
+                value = _FLOAT.unpack_from(buf, pos)[0]
+            pos += length
+        elif key == 0x31:  # double_val (非 packed)
+            value = _DOUBLE.unpack_from(buf, pos)[0]
+            pos += 8
+        elif key == 0x32:  # double_val (packed)
+            length, pos = _read_varint(buf, pos)
+            if length >= 8:
+                value = _DOUBLE.unpack_from(buf, pos)[0]
+            pos += length
+        else:
+            pos = _skip_field(buf, pos, key & 7)
+    if value is None and content is not None:
+        start, length = content
+        if dtype == _DT_FLOAT and length >= 4:
+            value = _FLOAT.unpack_from(buf, start)[0]
+        elif dtype == _DT_DOUBLE and length >= 8:
+            value = _DOUBLE.unpack_from(buf, start)[0]
+    return value
+
+
+# 解析 Summary.Value, 返回 (tag, value); 非 scalar 返回 (tag, None)
+def _parse_value(buf, pos, end, scalar_tags, tags_only):
+    tag = None
+    value = None
+    tensor = None
+    is_scalar_meta = False
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        if key == 0x0A:  # tag
+            length, pos = _read_varint(buf, pos)
+            tag = bytes(buf[pos:pos + length]).decode("utf-8", "replace")
+            pos += length
+        elif key == 0x15:  # simple_value
+            value = 0.0 if tags_only else _FLOAT.unpack_from(buf, pos)[0]
+            pos += 4
+        elif key == 0x4A:  # metadata
+            length, pos = _read_varint(buf, pos)
+            is_scalar_meta = _is_scalar_metadata(buf, pos, pos + length)
+            pos += length
+        elif key == 0x42:  # tensor
+            length, pos = _read_varint(buf, pos)
+            tensor = (pos, pos + length)
+            pos += length
+        else:
+            # image / histo / audio 等字段按长度跳过, 不解码
+            pos = _skip_field(buf, pos, key & 7)
+
+    if value is not None:
+        return tag, value
+    # TF2 写出的 scalar 以 tensor 形式存储, 元数据只在首次出现时携带
+    if is_scalar_meta:
+        scalar_tags.add(tag)
+    if tensor is not None and tag in scalar_tags:
+        if tags_only:
+            return tag, 0.0
+        return tag, _tensor_scalar(buf, tensor[0], tensor[1])
+    return tag, None
+
+
+def _parse_event(buf, pos, end, series, scalar_tags, tags_only):
+    wall_time = 0.0
+    step = 0
+    summary = None
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        if key == 0x09:  # wall_time
+            wall_time = _DOUBLE.unpack_from(buf, pos)[0]
+            pos += 8
+        elif key == 0x10:  # step
+            step, pos = _read_varint(buf, pos)
+            if step >= 1 << 63:
+                step -= 1 << 64
+        elif key == 0x2A:  # summary
+            length, pos = _read_varint(buf, pos)
+            summary = (pos, pos + length)
+            pos += length
+        else:
+            # graph_def / meta_graph_def / run_metadata 等整体跳过
+            pos = _skip_field(buf, pos, key & 7)
+    if summary is None:
+        return
+
+    pos, end = summary
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        if key != 0x0A:
+            pos = _skip_field(buf, pos, key & 7)
+            continue
+        length, pos = _read_varint(buf, pos)
+        tag, value = _parse_value(buf, pos, pos + length, scalar_tags, tags_only)
+        pos += length
+        if value is None:
+            continue
+        columns = series.get(tag)
+        if columns is None:
+            columns = series[tag] = (array("q"), array("d"), array("f"))
+        if not tags_only:
+            columns[0].append(step)
+            columns[1].append(wall_time)
+            columns[2].append(value)
+
+
+def _masked_crc32c(data):
+    from tensorboard.compat.tensorflow_stub.pywrap_tensorflow import masked_crc32c
+    return masked_crc32c(data)
+
+
+# 扫描 buf[start:end] 中的完整记录, 返回最后一条完整记录之后的偏移
+def _scan(buf, start, end, series, scalar_tags, tags_only, verify_crc):
+    pos = start
+    while pos + _HEADER.size <= end:
+        length, length_crc = _HEADER.unpack_from(buf, pos)
+        data_start = pos + _HEADER.size
+        data_end = data_start + length
+        if data_end + 4 > end:
+            # 末尾记录还没写完 (训练仍在进行), 留给下次读取
+            break
+        if verify_crc:
+            if _masked_crc32c(bytes(buf[pos:pos + 8])) != length_crc:
+                raise ValueError(f"记录长度 CRC 校验失败, 偏移 {pos}")
+            data_crc = struct.unpack_from("<I", buf, data_end)[0]
+            if _masked_crc32c(bytes(buf[data_start:data_end])) != data_crc:
+                raise ValueError(f"记录内容 CRC 校验失败, 偏移 {pos}")
+        _parse_event(buf, data_start, data_end, series, scalar_tags, tags_only)
+        pos = data_end + 4
+    return pos
+
+
+def _scan_file(path, tags_only, verify_crc, offset=0, scalar_tags=None):
+    series = {}
+    if scalar_tags is None:
+        scalar_tags = set()
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size <= offset:
+            return series, offset
+        # mmap 按需分页, 只会真正读取 offset 之后的部分
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            end = _scan(buf, offset, size, series, scalar_tags, tags_only, verify_crc)
+    return series, end
+
+
+def _to_series(columns):
+    steps, wall_times, values = columns
+    return ScalarSeries(
+        np.frombuffer(steps, dtype=np.int64) if steps else np.empty(0, dtype=np.int64),
+        np.frombuffer(wall_times, dtype=np.float64) if wall_times else np.empty(0, dtype=np.float64),
+        np.frombuffer(values, dtype=np.float32) if values else np.empty(0, dtype=np.float32),
+    )
+
+
+# 读取全部 scalar: {tag: ScalarSeries}, 不做采样
+def read_event_scalars(path, verify_crc=False):
+    series, _ = _scan_file(path, False, verify_crc)
+    return {tag: _to_series(columns) for tag, columns in series.items()}
+
+
+# 从 offset 开始增量读取, 返回 (新数据, 下次读取的 offset)
+# scalar_tags 需由调用方跨次保留: TF2 的 scalar 元数据只出现在该 tag 的第一条记录中
+def read_event_scalars_from(path, offset=0, scalar_tags=None, verify_crc=False):
+    series, end = _scan_file(path, False, verify_crc, offset, scalar_tags)
+    return {tag: _to_series(columns) for tag, columns in series.items()}, end
+
+
+# 只收集 scalar tag 列表, 供 scalar 选择器使用
+def read_event_tags(path, verify_crc=False):
+    series, _ = _scan_file(path, True, verify_crc)
+    return list(series.keys())
@@ -1,7 +1,25 @@
 import os
+import gzip
 import zipfile
+import tarfile
 import tempfile
 import shutil
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils.parallel_loader import iter_event_scalars
+from utils.metrics import stage
+from utils.scalar_store import write_run, write_manifest, open_store, close_stores_under, is_store_archive
+
+# 解压限制 (防 zip 炸弹), 可通过环境变量覆盖
+MAX_MEMBER_BYTES = int(os.environ.get("TB_DRAW_MAX_MEMBER_MB", str(16 * 1024))) * 1024 * 1024
+MAX_TOTAL_BYTES = int(os.environ.get("TB_DRAW_MAX_TOTAL_MB", str(64 * 1024))) * 1024 * 1024
+MAX_COMPRESSION_RATIO = float(os.environ.get("TB_DRAW_MAX_RATIO", "200"))
+EXTRACT_WORKERS = int(os.environ.get("TB_DRAW_EXTRACT_WORKERS", "4"))
+
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+_COPY_CHUNK = 1024 * 1024
+
 
 def extract_zip(zip_file):
     tmp_dir = tempfile.mkdtemp()
@@ -9,21 +27,187 @@ def extract_zip(zip_file):
         zip_ref.extractall(tmp_dir)
     return tmp_dir
 
+
+def is_event_file(name):
+    return "tfevents" in os.path.basename(name)
+
+
+# 归档内的相对路径, 拒绝绝对路径和 ".." 穿越
+def _safe_relpath(name):
+    normalized = os.path.normpath(name.replace("\\", "/"))
+    if os.path.isabs(normalized) or normalized.split(os.sep)[0] == "..":
+        return None
+    return normalized
+
+
+# 边复制边计数, 实际字节数超出声明或上限时中止
+def _copy_limited(src, dst_path, limit):
+    written = 0
+    with open(dst_path, 'wb') as dst:
+        while True:
+            chunk = src.read(_COPY_CHUNK)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > limit:
+                raise ValueError(f"解压后的文件超过限制: {dst_path}")
+            dst.write(chunk)
+    return written
+
+
+# 只解压 zip 中的 tfevents 成员: 读中央目录筛选, 多线程流式解压
+def _extract_zip_events(zip_path, dest):
+    members = []
+    total = 0
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not is_event_file(info.filename):
+                continue
+            relpath = _safe_relpath(info.filename)
+            if relpath is None:
+                print(f"[警告] 跳过不安全的路径: {info.filename}")
+                continue
+            if info.file_size > MAX_MEMBER_BYTES:
+                raise ValueError(f"{info.filename} 解压后 {info.file_size} 字节, 超过单文件限制")
+            if info.compress_size and info.file_size / info.compress_size > MAX_COMPRESSION_RATIO:
+                raise ValueError(f"{info.filename} 压缩比异常, 疑似 zip 炸弹")
+            total += info.file_size
+            members.append((info.filename, relpath, info.file_size))
+    if total > MAX_TOTAL_BYTES:
+        raise ValueError(f"压缩包内 event 文件共 {total} 字节, 超过总量限制")
+
+    def extract_one(member):
+        name, relpath, size = member
+        target = os.path.join(dest, relpath)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 每个线程单独打开压缩包, 解压 (zlib) 时会释放 GIL
+        with zipfile.ZipFile(zip_path, 'r') as zf, zf.open(name) as src:
+            _copy_limited(src, target, size)
+        return relpath
+
+    if len(members) <= 1:
+        return [extract_one(m) for m in members]
+    with ThreadPoolExecutor(max_workers=min(EXTRACT_WORKERS, len(members))) as pool:
+        return list(pool.map(extract_one, members))
+
+
+# tar 包只能顺序读取: 流式遍历, 只落盘 tfevents 成员
+def _extract_tar_events(tar_path, dest):
+    extracted = []
+    total = 0
+    with tarfile.open(tar_path, 'r|*') as tf:
+        for member in tf:
+            if not member.isfile() or not is_event_file(member.name):
+                continue
+            relpath = _safe_relpath(member.name)
+            if relpath is None:
+                print(f"[警告] 跳过不安全的路径: {member.name}")
+                continue
+            if member.size > MAX_MEMBER_BYTES:
+                raise ValueError(f"{member.name} 解压后 {member.size} 字节, 超过单文件限制")
+            total += member.size
+            if total > MAX_TOTAL_BYTES:
+                raise ValueError("压缩包内 event 文件超过总量限制")
+            target = os.path.join(dest, relpath)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _copy_limited(tf.extractfile(member), target, member.size)
+            extracted.append(relpath)
+    return extracted
+
+
+# 单独 gzip 压缩的 event 文件 (不是 tar 包): 流式解压到 dest, 返回解压后的文件名
+def _gunzip_event(gz_path, dest):
+    short = os.path.basename(gz_path)[:-len('.gz')]
+    limit = min(MAX_MEMBER_BYTES, int(os.path.getsize(gz_path) * MAX_COMPRESSION_RATIO))
+    os.makedirs(dest, exist_ok=True)
+    with gzip.open(gz_path, 'rb') as src:
+        _copy_limited(src, os.path.join(dest, short), limit)
+    return short
+
+
+# 不同来源里的同名 event 文件 (如两个压缩包里都有 run1/events...) 加上来源名区分, 仍重名时追加序号
+# 同一个文件重复给出时只保留一份
+def _unique_names(entries):
+    counts = Counter(short for _, short, _ in entries)
+    names = set()
+    fulls = set()
+    result = []
+    for source, short, full in entries:
+        if full in fulls:
+            continue
+        fulls.add(full)
+        name = f"{source}/{short}" if counts[short] > 1 else short
+        base, n = name, 1
+        while name in names:
+            n += 1
+            name = f"{base} ({n})"
+        names.add(name)
+        result.append((name, full))
+    return result
+
+
+# 后台删除目录, 不阻塞请求
+def remove_dir_async(path):
+    if not path or not os.path.isdir(path):
+        return None
+    thread = threading.Thread(target=shutil.rmtree, args=(path, True), daemon=True)
+    thread.start()
+    return thread
+
+
+def _name(file):
+    return file if isinstance(file, str) else file.name
+
+
+# uploaded_files 可以是上传的文件对象或服务器本地路径: zip / tar(.gz) / 单个 event 文件 (可 gzip 压缩) / 目录
+# 每个压缩包解压到各自的子目录, 互不覆盖
 def upload_files(uploaded_files, global_tmp_dir):
     if global_tmp_dir:
-        shutil.rmtree(global_tmp_dir)
+        close_stores_under(global_tmp_dir)
+        remove_dir_async(global_tmp_dir)
     global_tmp_dir = tempfile.mkdtemp()
 
-    for file in uploaded_files:
-        if file.name.endswith('.zip'):
-            with zipfile.ZipFile(file.name, 'r') as zip_ref:
-                zip_ref.extractall(global_tmp_dir)
-        else:
-            shutil.copy(file.name, global_tmp_dir)
+    entries = []  # (来源名, 相对路径, 完整路径)
+    with stage("ingest") as record:
+        for i, file in enumerate(uploaded_files):
+            path = _name(file)
+            source = os.path.basename(os.path.normpath(path))
+            dest = os.path.join(global_tmp_dir, f"u{i:03d}")
+            if os.path.isfile(path):
+                record.bytes += os.path.getsize(path)
+            if os.path.isdir(path):
+                # 本地目录直接原地读取, 不复制
+                pairs = [(short, os.path.join(path, short)) for short in find_event_files(path)]
+            elif path.endswith('.zip') and is_store_archive(path):
+                # 已建好索引的列式存储, 直接 mmap 打开, 不解压不解析
+                pairs = open_store(path)
+            elif path.endswith('.zip'):
+                pairs = [(short, os.path.join(dest, short)) for short in _extract_zip_events(path, dest)]
+            elif path.endswith(TAR_SUFFIXES):
+                pairs = [(short, os.path.join(dest, short)) for short in _extract_tar_events(path, dest)]
+            elif path.endswith('.gz'):
+                short = _gunzip_event(path, dest)
+                pairs = [(short, os.path.join(dest, short))]
+            else:
+                # 单个 event 文件原地引用, 不再复制
+                pairs = [(source, path)]
+            entries += [(source, short, full) for short, full in pairs]
 
-    event_files = find_event_files(global_tmp_dir)
-    event_paths = [(short, os.path.join(global_tmp_dir, short)) for short in event_files]
-    return global_tmp_dir, event_paths
+    return global_tmp_dir, _unique_names(entries)
+
+
+# 把 event 文件 (并行解析后) 转换为列式存储并打开, 返回 (存储目录, 指向存储的 event 列表)
+# 每解析完一个文件就写出它的列, 内存中最多只有正在写的那个 run; run 编号按输入顺序分配
+def import_to_store(event_paths, global_tmp_dir, max_workers=None):
+    store_dir = tempfile.mkdtemp(prefix="tbstore_", dir=global_tmp_dir)
+    index_by_full = {full: i for i, (_, full) in enumerate(event_paths)}
+    runs = {}
+    for full, series in iter_event_scalars(list(index_by_full), max_workers):
+        i = index_by_full[full]
+        run_id = f"r{i:04d}"
+        runs[run_id] = write_run(store_dir, run_id, event_paths[i][0], series)
+    write_manifest(store_dir, runs)
+    return store_dir, open_store(store_dir)
 
 def find_event_files(folder):
     event_files = []
@@ -33,11 +217,3 @@ def find_event_files(folder):
                 relative_path = os.path.relpath(os.path.join(root, file), folder)
                 event_files.append(relative_path)
     return event_files
-
-# 压缩打包下载所有图片
-def pack_images(image_list):
-    tmp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-    with zipfile.ZipFile(tmp_zip.name, 'w') as zf:
-        for img in image_list:
-            zf.write(img, arcname=os.path.basename(img))
-    return tmp_zip.name
\ No newline at end of file
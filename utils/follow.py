@@ -0,0 +1,136 @@
+import os
+import numpy as np
+from utils.event_reader import read_event_scalars_from
+from utils.file_utils import find_event_files
+from utils.series import ScalarSeries
+
+
+# 可增长的 scalar 序列, 容量按倍数扩展, 追加的均摊开销与新数据量成正比
+class _SeriesBuffer:
+    __slots__ = ("steps", "wall_times", "values", "size", "sorted")
+
+    def __init__(self):
+        self.steps = np.empty(0, dtype=np.int64)
+        self.wall_times = np.empty(0, dtype=np.float64)
+        self.values = np.empty(0, dtype=np.float32)
+        self.size = 0
+        self.sorted = {"step": True, "wall_time": True}  # 横轴是否非降序, 追加时只检查新数据
+
+    def extend(self, steps, wall_times, values):
+        n = len(steps)
+        needed = self.size + n
+        if needed > len(self.steps):
+            capacity = max(needed, 2 * len(self.steps), 1024)
+            for name in ("steps", "wall_times", "values"):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:self.size] = old[:self.size]
+                setattr(self, name, new)
+        self.steps[self.size:needed] = steps
+        self.wall_times[self.size:needed] = wall_times
+        self.values[self.size:needed] = values
+        for axis, column in (("step", self.steps), ("wall_time", self.wall_times)):
+            if self.sorted[axis]:
+                tail = column[max(self.size - 1, 0):needed]
+                self.sorted[axis] = bool(np.all(tail[1:] >= tail[:-1]))
+        self.size = needed
+
+    def view(self):
+        return ScalarSeries(self.steps[:self.size], self.wall_times[:self.size], self.values[:self.size],
+                            sorted_axes=self.sorted)
+
+
+# 文件开头用于识别同一文件的字节数: 首条记录 (file_version) 含写入时间, 重写的文件这里会不同
+HEAD_BYTES = 64
+
+
+def _read_head(path):
+    with open(path, "rb") as f:
+        return f.read(HEAD_BYTES)
+
+
+# 单个 event 文件的读取进度
+class _FileState:
+    __slots__ = ("offset", "scalar_tags", "series", "inode", "head")
+
+    def __init__(self):
+        self.offset = 0
+        self.scalar_tags = set()
+        self.series = {}
+        self.inode = None
+        self.head = b""
+
+    # 文件被截断、替换 (轮转后 inode 变化) 或原地重写 (开头不同) 时, 旧的偏移已失效
+    # 追加写入时 mtime 每次都会变化, 不能单独用来判断
+    def replaced(self, st, path):
+        if self.inode is None:
+            return False
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            return True
+        return len(self.head) == HEAD_BYTES and _read_head(path) != self.head
+
+
+# 跟踪本地日志目录: 记住每个 event 文件的字节偏移, 每次只读新追加的记录
+class LogFollower:
+    def __init__(self, log_dir):
+        self.log_dir = os.path.abspath(log_dir)
+        self.files = {}  # short -> _FileState
+        self.keys = {}  # "tag (short)" -> (short, tag)
+        self.versions = {}  # "tag (short)" -> 数据更新次数
+
+    @property
+    def event_files(self):
+        return [(short, os.path.join(self.log_dir, short)) for short in self.files]
+
+    # 读取新增数据, 返回本次有更新的 scalar key 集合
+    def poll(self):
+        changed = set()
+        for short in find_event_files(self.log_dir):
+            state = self.files.get(short)
+            if state is None:
+                state = self.files[short] = _FileState()
+            full_path = os.path.join(self.log_dir, short)
+            try:
+                st = os.stat(full_path)
+                replaced = state.replaced(st, full_path)
+            except OSError:
+                continue
+            size = st.st_size
+            if replaced:
+                # 从头重新读取
+                for tag in state.series:
+                    key = f"{tag} ({short})"
+                    self.keys.pop(key, None)
+                    self.versions[key] = self.versions.get(key, 0) + 1
+                    changed.add(key)
+                state = self.files[short] = _FileState()
+            if size == state.offset:
+                continue
+            if state.inode is None or len(state.head) < HEAD_BYTES:
+                try:
+                    state.inode, state.head = st.st_ino, _read_head(full_path)
+                except OSError:
+                    continue
+
+            new_series, state.offset = read_event_scalars_from(full_path, state.offset, state.scalar_tags)
+            for tag, new in new_series.items():
+                buffer = state.series.get(tag)
+                if buffer is None:
+                    buffer = state.series[tag] = _SeriesBuffer()
+                buffer.extend(*new.columns())
+                key = f"{tag} ({short})"
+                self.keys[key] = (short, tag)
+                self.versions[key] = self.versions.get(key, 0) + 1
+                changed.add(key)
+        return changed
+
+    # {"tag (short)": (short, tag)}, 与 get_all_scalars 的 key 格式一致
+    def scalar_options(self):
+        return dict(self.keys)
+
+    # 返回 ScalarSeries 视图, 不复制数据; 不存在时返回 None
+    def get_series(self, key):
+        if key not in self.keys:
+            return None
+        short, tag = self.keys[key]
+        return self.files[short].series[tag].view()
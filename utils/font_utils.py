@@ -1,4 +1,8 @@
-from matplotlib.font_manager import FontProperties, fontManager
+import os
+import json
+import shutil
+import hashlib
+import threading
 
 default_fonts = [
     "Arial", "Times New Roman", "Courier New", "Georgia",
@@ -6,15 +10,84 @@ default_fonts = [
     "FangSong", "KaiTi", "DejaVu Sans"
 ]
 
+# 上传字体的持久化目录: 文件按内容哈希命名, fonts.json 记录 哈希 -> (字体名, 路径), 重启后仍可用
+FONT_DIR = os.environ.get(
+    "TB_DRAW_FONT_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tensorboard_draw", "fonts"),
+)
+REGISTRY_NAME = "fonts.json"
+
+# 字体名 -> 字体文件路径; 绘图时以 FontProperties(fname=...) 直接加载, 不依赖 fontManager 查找,
+# 绘图进程也无需注册或重新扫描字体
 uploaded_fonts = {}
+_registry = {}  # 哈希 -> {"name": 字体名, "path": 路径}
+_lock = threading.Lock()
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_registry():
+    try:
+        with open(os.path.join(FONT_DIR, REGISTRY_NAME), encoding="utf-8") as f:
+            registry = json.load(f)
+    except (OSError, ValueError):
+        return
+    for digest, entry in registry.items():
+        if os.path.isfile(entry["path"]):
+            _registry[digest] = entry
+            uploaded_fonts[entry["name"]] = entry["path"]
+
+
+def _save_registry():
+    os.makedirs(FONT_DIR, exist_ok=True)
+    tmp_path = os.path.join(FONT_DIR, REGISTRY_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_registry, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(FONT_DIR, REGISTRY_NAME))
+
+
+# 登记一个字体文件, 返回字体名; 内容相同的文件只登记一次
+# 只调用 fontManager.addfont 增量加入, 不做 _rebuild (重新扫描全部系统字体并重写缓存)
+def register_font(path):
+    digest = _file_hash(path)
+    with _lock:
+        if digest in _registry:
+            return _registry[digest]["name"]
+
+    from matplotlib.font_manager import FontProperties, fontManager
+    try:
+        font_name = FontProperties(fname=path).get_name()
+    except (OSError, RuntimeError) as e:
+        raise ValueError(f"无法读取字体文件 {os.path.basename(path)}: {e}")
+
+    os.makedirs(FONT_DIR, exist_ok=True)
+    stored_path = os.path.join(FONT_DIR, digest[:16] + os.path.splitext(path)[1].lower())
+    if not os.path.exists(stored_path):
+        shutil.copyfile(path, stored_path)
+    fontManager.addfont(stored_path)
+
+    with _lock:
+        _registry[digest] = {"name": font_name, "path": stored_path}
+        uploaded_fonts[font_name] = stored_path
+        _save_registry()
+    return font_name
+
+
+def font_choices():
+    return default_fonts + [name for name in uploaded_fonts if name not in default_fonts]
+
 
 def upload_font_file(font_file):
     if font_file is None:
         return default_fonts
-    font_path = font_file.name
-    font_prop = FontProperties(fname=font_path)
-    font_name = font_prop.get_name()
-    fontManager.addfont(font_path)
-    uploaded_fonts[font_name] = font_path
-    fontManager._rebuild()
-    return default_fonts + list(uploaded_fonts.keys()), font_name
+    font_name = register_font(font_file if isinstance(font_file, str) else font_file.name)
+    return font_choices(), font_name
+
+
+_load_registry()
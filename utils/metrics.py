@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 按阶段统计耗时 / 读取字节 / 处理点数 / 主进程峰值 RSS:
+#   - 每个界面请求一个 Trace, 结束时写一行 JSON 日志, 并在界面的耗时面板中显示
+#   - 所有请求的累计值以 Prometheus 文本格式在本地端口暴露
+# 阶段之间可以嵌套或重叠 (例如 render 的墙钟时间包含各进程的 draw / savefig), 各自单独累计
+# RSS 只采样界面所在的主进程, 是整个进程的占用 (含其他并发请求), 不含解析 / 绘图子进程
+
+STAGE_LABELS = {
+    "ingest": "上传解包",
+    "tags": "tag 发现",
+    "parse": "scalar 解析",
+    "smooth": "平滑",
+    "decimate": "降采样",
+    "aggregate": "多 run 对齐与统计",
+    "render": "绘图 (墙钟)",
+    "draw": "matplotlib 绘制 (各进程合计)",
+    "savefig": "savefig 编码 (各进程合计)",
+    "export": "写入导出文件",
+}
+
+TIMING_HEADERS = ["阶段", "耗时 (s)", "次数", "字节数", "点数", "主进程峰值 RSS (MB)"]
+
+# JSON 日志去向: "-" 为标准错误, 空字符串关闭, 其余视为文件路径 (追加写入)
+METRICS_LOG = os.environ.get("TB_DRAW_METRICS_LOG", "-")
+METRICS_HOST = os.environ.get("TB_DRAW_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("TB_DRAW_METRICS_PORT", "9464"))
+
+# 请求耗时直方图的桶上限 (秒)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+_current = contextvars.ContextVar("tb_draw_trace", default=None)
+_lock = threading.Lock()
+_stage_totals = {}  # stage -> [seconds, calls, bytes, points]
+_request_totals = {}  # handler -> {"count", "seconds", "buckets", "peak_rss"}
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # 非 Linux 退化为进程历史峰值 (macOS 单位为字节, Linux 为 KB); Windows 没有 resource 模块, 返回 0
+        try:
+            import resource
+        except ImportError:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# 后台线程定时采样 RSS, 更新所有进行中的请求与阶段的峰值
+class _RssSampler:
+    def __init__(self):
+        self._watchers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, obj):
+        obj.peak_rss = max(obj.peak_rss, rss_bytes())
+        with self._lock:
+            self._watchers.add(obj)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def unwatch(self, obj):
+        obj.peak_rss = max(obj.peak_rss, rss_bytes())
+        with self._lock:
+            self._watchers.discard(obj)
+
+    def _run(self):
+        while True:
+            time.sleep(RSS_SAMPLE_INTERVAL)
+            with self._lock:
+                watchers = list(self._watchers)
+            if watchers:
+                rss = rss_bytes()
+                for obj in watchers:
+                    obj.peak_rss = max(obj.peak_rss, rss)
+
+
+_sampler = _RssSampler()
+
+
+class StageRecord:
+    __slots__ = ("seconds", "calls", "bytes", "points", "peak_rss")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.bytes = 0
+        self.points = 0
+        self.peak_rss = 0
+
+    def merge(self, other):
+        self.seconds += other.seconds
+        self.calls += other.calls
+        self.bytes += other.bytes
+        self.points += other.points
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+
+
+# 单个界面请求的统计
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.seconds = 0.0
+        self.peak_rss = 0
+        self.stages = {}  # stage -> StageRecord, 按首次出现的顺序
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self, stage, record):
+        with self._lock:
+            self.stages.setdefault(stage, StageRecord()).merge(record)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {
+                stage: {
+                    "seconds": round(r.seconds, 6), "calls": r.calls, "bytes": r.bytes,
+                    "points": r.points, "process_peak_rss_bytes": r.peak_rss,
+                }
+                for stage, r in self.stages.items()
+            }
+        return {
+            "event": "request", "handler": self.name,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(self.seconds, 6), "process_peak_rss_bytes": self.peak_rss, "stages": stages,
+        }
+
+    # 耗时面板的表格行
+    def rows(self):
+        with self._lock:
+            rows = [
+                [STAGE_LABELS.get(stage, stage), round(r.seconds, 3), r.calls, r.bytes, r.points,
+                 round(r.peak_rss / 2**20, 1)]
+                for stage, r in self.stages.items()
+            ]
+        status = "合计" if self.finished else "合计 (进行中)"
+        elapsed = self.seconds if self.finished else time.time() - self.started
+        rows.append([f"{status}: {self.name}", round(elapsed, 3), 1, "", "", round(self.peak_rss / 2**20, 1)])
+        return rows
+
+
+def current_trace():
+    return _current.get()
+
+
+def _record(stage, record):
+    with _lock:
+        totals = _stage_totals.setdefault(stage, [0.0, 0, 0, 0])
+        totals[0] += record.seconds
+        totals[1] += record.calls
+        totals[2] += record.bytes
+        totals[3] += record.points
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, record)
+
+
+# 统计一段代码: with stage("parse") as s: ...; s.bytes += n; s.points += m
+@contextmanager
+def stage(name):
+    record = StageRecord()
+    record.calls = 1
+    _sampler.watch(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        _sampler.unwatch(record)
+        _record(name, record)
+
+
+# 记录在别处 (例如子进程) 测得的耗时
+def record_stage(name, seconds, calls=1, bytes=0, points=0):
+    record = StageRecord()
+    record.seconds = seconds
+    record.calls = calls
+    record.bytes = bytes
+    record.points = points
+    _record(name, record)
+
+
+# 统计生成器: 只计算生成器内部运行的时间, 不含调用方在两次产出之间的处理时间
+def metered(name, iterable, bytes_of=None, points_of=None):
+    record = StageRecord()
+    trace = None
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record.seconds += time.perf_counter() - start
+                break
+            record.seconds += time.perf_counter() - start
+            record.calls += 1
+            record.peak_rss = max(record.peak_rss, rss_bytes())
+            trace = trace or _current.get()
+            if bytes_of is not None:
+                record.bytes += bytes_of(item)
+            if points_of is not None:
+                record.points += points_of(item)
+            yield item
+    finally:
+        # 空输入 (例如导出时全部命中渲染缓存) 不记录
+        if record.calls:
+            token = _current.set(trace or _current.get())
+            try:
+                _record(name, record)
+            finally:
+                _current.reset(token)
+
+
+def _emit_log(payload):
+    if not METRICS_LOG:
+        return
+    line = json.dumps(payload, ensure_ascii=False)
+    if METRICS_LOG == "-":
+        print(line, file=sys.stderr, flush=True)
+        return
+    with _lock, open(METRICS_LOG, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def _finish(trace):
+    trace.seconds = time.time() - trace.started
+    _sampler.unwatch(trace)
+    trace.finished = True
+    with _lock:
+        totals = _request_totals.setdefault(
+            trace.name, {"count": 0, "seconds": 0.0, "buckets": [0] * len(DURATION_BUCKETS), "peak_rss": 0}
+        )
+        totals["count"] += 1
+        totals["seconds"] += trace.seconds
+        for i in range(bisect.bisect_left(DURATION_BUCKETS, trace.seconds), len(DURATION_BUCKETS)):
+            totals["buckets"][i] += 1
+        totals["peak_rss"] = trace.peak_rss
+    _emit_log(trace.to_dict())
+
+
+# 装饰界面回调: 每次调用新建一个 Trace, 期间的阶段统计都记入其中
+# Gradio 在线程池中逐步推进生成器, 每一步的上下文都不同, 所以在每次 next 前后设置当前 Trace
+def traced(name):
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                trace = Trace(name)
+                _sampler.watch(trace)
+                token = _current.set(trace)
+                try:
+                    iterator = fn(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+                try:
+                    while True:
+                        token = _current.set(trace)
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            _current.reset(token)
+                        yield item
+                finally:
+                    iterator.close()
+                    _finish(trace)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                trace = Trace(name)
+                _sampler.watch(trace)
+                token = _current.set(trace)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+                    _finish(trace)
+        return wrapper
+    return decorate
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Prometheus 文本格式
+def render_prometheus():
+    with _lock:
+        stages = {stage: list(totals) for stage, totals in _stage_totals.items()}
+        requests = {name: dict(totals, buckets=list(totals["buckets"])) for name, totals in _request_totals.items()}
+    lines = []
+    for metric, index, kind, help_text in (
+        ("tb_draw_stage_seconds_total", 0, "counter", "各阶段累计耗时 (秒)"),
+        ("tb_draw_stage_calls_total", 1, "counter", "各阶段调用次数"),
+        ("tb_draw_stage_bytes_total", 2, "counter", "各阶段的字节数 (读取的输入或写出的输出)"),
+        ("tb_draw_stage_points_total", 3, "counter", "各阶段处理的数据点数"),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{stage="{_label(stage)}"}} {totals[index]}' for stage, totals in stages.items()]
+
+    lines += ["# HELP tb_draw_request_duration_seconds 界面请求耗时",
+              "# TYPE tb_draw_request_duration_seconds histogram"]
+    for name, totals in requests.items():
+        handler = _label(name)
+        for bound, count in zip(DURATION_BUCKETS, totals["buckets"]):
+            lines.append(f'tb_draw_request_duration_seconds_bucket{{handler="{handler}",le="{bound}"}} {count}')
+        lines.append(f'tb_draw_request_duration_seconds_bucket{{handler="{handler}",le="+Inf"}} {totals["count"]}')
+        lines.append(f'tb_draw_request_duration_seconds_sum{{handler="{handler}"}} {totals["seconds"]}')
+        lines.append(f'tb_draw_request_duration_seconds_count{{handler="{handler}"}} {totals["count"]}')
+
+    lines += ["# HELP tb_draw_request_peak_rss_bytes 最近一次请求期间主进程的峰值 RSS (整个进程, 不含子进程)",
+              "# TYPE tb_draw_request_peak_rss_bytes gauge"]
+    lines += [f'tb_draw_request_peak_rss_bytes{{handler="{_label(name)}"}} {totals["peak_rss"]}'
+              for name, totals in requests.items()]
+    lines += ["# HELP tb_draw_process_rss_bytes 当前进程 RSS", "# TYPE tb_draw_process_rss_bytes gauge",
+              f"tb_draw_process_rss_bytes {rss_bytes()}"]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# 在后台线程启动 /metrics 端点, 端口为 0 时不启动
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[警告] 指标端口 {host}:{port} 启动失败: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,113 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from utils.scalar_cache import (
+    parse_event_scalars, load_event_tags,
+    peek_event_scalars, peek_event_tags,
+    remember_event_scalars, remember_event_tags,
+)
+from utils.scheduler import iter_pool
+from utils.metrics import metered
+
+# 解析 event 文件的进程数, 可通过环境变量覆盖
+DEFAULT_WORKERS = int(os.environ.get("TB_DRAW_WORKERS", os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# 全局共享一个固定大小的进程池; 单个请求的 max_workers 只限制它的在途任务数
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn 避免在带有 Web 服务线程的进程里 fork
+            _pool = ProcessPoolExecutor(max_workers=DEFAULT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+# 进程池崩溃后丢弃, 下次使用时重建; 其他请求可能已换上新池, 只替换仍是 broken 的那个
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+# 子进程入口: 返回 NumPy 数组 (pickle 时是连续内存块), 不传事件对象
+def _worker_tags(path):
+    return load_event_tags(path)
+
+
+# 子进程只解析并写磁盘缓存, 不留内存副本 (主进程会登记结果, 子进程的内存缓存不会被读到)
+def _worker_scalars(path):
+    return parse_event_scalars(path)
+
+
+def _fan_out(paths, peek, worker, remember, max_workers):
+    max_workers = max(1, int(max_workers or DEFAULT_WORKERS))
+    pending = []
+    for path in dict.fromkeys(paths):
+        try:
+            cached = peek(path)
+        except OSError as e:
+            print(f"[警告] 读取 {path} 失败, 跳过: {e}")
+            continue
+        if cached is not None:
+            yield path, cached
+        else:
+            pending.append(path)
+    if not pending:
+        return
+
+    # 只有一个文件或只允许单进程时直接在当前进程解析, 省去进程间传输
+    if max_workers == 1 or len(pending) == 1:
+        for path in pending:
+            try:
+                result = worker(path)
+            except Exception as e:
+                print(f"[警告] 解析 {path} 失败, 跳过: {e}")
+                continue
+            remember(path, result)
+            yield path, result
+        return
+
+    for i, future in iter_pool(_get_pool, _reset_pool, worker, pending, max_workers):
+        path = pending[i]
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"[警告] 解析 {path} 失败, 跳过: {e}")
+            continue
+        remember(path, result)
+        yield path, result
+
+
+def _input_bytes(result):
+    return os.path.getsize(result[0]) if os.path.isfile(result[0]) else 0
+
+
+# 并行发现 tag, 按完成顺序产出 (path, [tag, ...])
+def iter_event_tags(paths, max_workers=None):
+    return metered(
+        "tags", _fan_out(paths, peek_event_tags, _worker_tags, remember_event_tags, max_workers),
+        bytes_of=_input_bytes, points_of=lambda result: len(result[1]),
+    )
+
+
+# 并行读取 scalar, 按完成顺序产出 (path, {tag: ScalarSeries})
+def iter_event_scalars(paths, max_workers=None):
+    return metered(
+        "parse", _fan_out(paths, peek_event_scalars, _worker_scalars, remember_event_scalars, max_workers),
+        bytes_of=_input_bytes, points_of=lambda result: sum(len(s) for s in result[1].values()),
+    )
@@ -1,40 +1,148 @@
 import os
-import tempfile
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.font_manager import FontProperties
-from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+import re
+import hashlib
+import zipfile
+import itertools
+from utils.scalar_cache import load_event_scalars, load_event_tags, source_fingerprint
+from utils.parallel_loader import iter_event_scalars, iter_event_tags
+from utils.smoothing import moving_average, smooth_values
+from utils.render import iter_render_charts, iter_render_pdf, FIGSIZE
+from utils.decimation import decimate, point_budget
+from utils.aggregate import DEFAULT_GROUP_PATTERN, group_runs, align_runs, reduce_runs
+from utils.font_utils import uploaded_fonts
+from utils.metrics import stage
+from utils import render_cache
+
+# matplotlib / seaborn 的 tab10 调色板, 写成常量避免为取颜色导入 seaborn
+TAB10 = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+]
+
+# 交互式预览发送到浏览器的点数: 每条曲线的上限与全部曲线的总上限
+PREVIEW_POINTS = int(os.environ.get("TB_DRAW_PREVIEW_POINTS", "1000"))
+PREVIEW_MAX_TOTAL_POINTS = int(os.environ.get("TB_DRAW_PREVIEW_MAX_POINTS", "20000"))
 
 
 # 读取指定文件的 scalar 列表
 def load_scalars(log_file_path):
-    ea = EventAccumulator(log_file_path)
-    ea.Reload()
-    return ea.Tags().get('scalars', [])
+    return load_event_tags(log_file_path)
 
 
-# 构造 scalar_map: {"scalar_name (file_name)": (event_file_path, scalar_name)}
-def get_all_scalars(selected_event_paths, global_event_files):
+# 按完成顺序逐步产出 scalar_map, 供界面流式刷新; 最后一次产出按选择顺序排列
+def iter_all_scalars(selected_event_paths, global_event_files, max_workers=None):
+    event_map = dict(global_event_files)
+    full_to_short = {event_map[file]: file for file in selected_event_paths}
+    tags_by_file = {}
     scalar_options = {}
-    for file in selected_event_paths:
-        full_file = dict(global_event_files)[file]
-        scalars = load_scalars(full_file)
+    for full_file, scalars in iter_event_tags(list(full_to_short), max_workers):
+        file = full_to_short[full_file]
+        tags_by_file[file] = scalars
         for scalar in scalars:
-            key = f"{scalar} ({file})"
-            scalar_options[key] = (full_file, scalar)
+            scalar_options[f"{scalar} ({file})"] = (full_file, scalar)
+        yield scalar_options
+
+    ordered = {}
+    for file in selected_event_paths:
+        for scalar in tags_by_file.get(file, []):
+            ordered[f"{scalar} ({file})"] = (event_map[file], scalar)
+    yield ordered
+
+
+# 构造 scalar_map: {"scalar_name (file_name)": (event_file_path, scalar_name)}
+def get_all_scalars(selected_event_paths, global_event_files, max_workers=None):
+    scalar_options = {}
+    for scalar_options in iter_all_scalars(selected_event_paths, global_event_files, max_workers):
+        pass
     return scalar_options
 
 
-# 平滑函数
+# 平滑函数 (滑动平均, 保留旧接口)
 def smooth(values, weight):
-    if weight <= 1:
-        return values
-    return [np.mean(values[max(0, i - weight + 1):i + 1]) for i in range(len(values))]
+    return moving_average(values, weight)
+
+
+def sanitize_filename(name):
+    return re.sub(r'[\\/*?:"<>|()\s]', "_", name)
+
+
+# 组装单条曲线的绘图任务, 交给 utils.render 渲染
+def make_chart(steps, values, label, color, xlabel, ylabel, dpi, show_grid, font_family, font_size, save_path,
+               x_axis="step"):
+    return {
+        "lines": [(steps, values, label, color)],
+        "title": label,
+        "xlabel": xlabel,
+        "ylabel": ylabel,
+        "dpi": dpi,
+        "show_grid": show_grid,
+        "font_family": font_family,
+        "font_path": uploaded_fonts.get(font_family),
+        "font_size": font_size,
+        "save_path": save_path,
+        "x_axis": x_axis,
+    }
+
+
+# 整理要绘制的图: [(显示名, event 文件, tag, 颜色, 缓存键, 文件名)], 按选择顺序
+# filenames 可指定 原始 key -> 文件名, 未指定的按 key 生成
+def _plan_charts(selected_paths, selected_scalars, title_map, xlabel, ylabel, dpi, smoothing, color_settings,
+                 show_grid, font_family, font_size, global_event_files, smoothing_mode, max_workers, decimation,
+                 x_axis="step", x_range=None, filenames=None):
+    # 正确构造 scalar_map
+    scalar_map = get_all_scalars(selected_paths, global_event_files, max_workers)
+
+    # 归一名称 mapping: display_name → ori_key
+    reverse_title_map = {v: k for k, v in title_map.items()}
+
+    color_cycle = itertools.cycle(TAB10)
+    font_path = uploaded_fonts.get(font_family)
+
+    plans = []
+    for display_scalar in selected_scalars:
+        ori_key = reverse_title_map.get(display_scalar, display_scalar)
+
+        if ori_key not in scalar_map:
+            print(f"[警告] Scalar '{display_scalar}' (原始: {ori_key}) 不在 scalar_map 中, 跳过")
+            continue
+
+        file_path, scalar_tag = scalar_map[ori_key]
+        color = color_settings.get(display_scalar, next(color_cycle))
+        filename = (filenames or {}).get(ori_key) or f"{sanitize_filename(ori_key)}.png"
+        key = render_cache.chart_key(
+            source_fingerprint(file_path), scalar_tag, smoothing_mode, smoothing, decimation,
+            display_scalar, color, xlabel, ylabel, dpi, show_grid, font_family, font_path, font_size, FIGSIZE,
+            x_axis, x_range,
+        )
+        plans.append((display_scalar, file_path, scalar_tag, color, key, filename))
+    return plans
+
+
+# 按横轴取值并平滑: 二分查找截取横轴范围, 只平滑范围内 (及核半径内) 的点, 返回 (x, y)
+def _curve(series, smoothing_mode, smoothing, x_axis="step", x_range=None):
+    index = series.index_range(*(x_range or (None, None)), axis=x_axis)
+    return series.x(x_axis, index), smooth_values(series.values, smoothing_mode, smoothing, index)
+
 
+# 读取一条曲线并平滑、截取、降采样, 没有数据时返回 None
+def _chart_series(display_scalar, file_path, scalar_tag, smoothing_mode, smoothing, decimation, dpi,
+                  x_axis="step", x_range=None):
+    series = load_event_scalars(file_path).get(scalar_tag)
+    if series is None or len(series) == 0:
+        print(f"[警告] Scalar '{display_scalar}' 没有事件数据, 跳过")
+        return None
 
-# 绘图函数
-def plot_selected_scalars(
+    x, values = _curve(series, smoothing_mode, smoothing, x_axis, x_range)
+    if len(x) == 0:
+        print(f"[警告] Scalar '{display_scalar}' 在横轴范围内没有数据, 跳过")
+        return None
+    # 按输出像素宽度降采样
+    return decimate(x, values, decimation, point_budget(dpi, FIGSIZE))
+
+
+# 绘图函数: 每完成一张图就产出一次当前已完成的图片列表 (按选择顺序)
+# 给出 output_dir 时直接渲染到该目录 (命令行出图), 不查也不写渲染缓存
+def iter_plot_selected_scalars(
     selected_paths,
     selected_scalars,
     title_map,
@@ -47,65 +155,364 @@ def plot_selected_scalars(
     font_family,
     font_size,
     global_event_files,
+    smoothing_mode="moving_average",
+    max_workers=None,
+    render_workers=None,
+    decimation="minmax",
+    x_axis="step",
+    x_range=None,
+    output_dir=None,
+    filenames=None,
 ):
-    # 正确构造 scalar_map
-    scalar_map = get_all_scalars(selected_paths, global_event_files)
+    plans = _plan_charts(
+        selected_paths, selected_scalars, title_map, xlabel, ylabel, dpi, smoothing, color_settings,
+        show_grid, font_family, font_size, global_event_files, smoothing_mode, max_workers, decimation,
+        x_axis, x_range, filenames,
+    )
 
-    # 归一名称 mapping: display_name → ori_key
-    reverse_title_map = {v: k for k, v in title_map.items()}
+    # 先查缓存: 命中的直接返回已有 PNG, 不解析也不绘制
+    if output_dir is None:
+        slots = [render_cache.lookup(key, filename) for *_, key, filename in plans]
+    else:
+        slots = [None] * len(plans)
+    misses = [(slot, plan) for slot, plan in enumerate(plans) if slots[slot] is None]
+
+    if len(misses) < len(slots):
+        yield [path for path in slots if path]
+
+    # 只把未命中的图用到的文件并行解析进缓存, 下面的循环只读内存
+    for _ in iter_event_scalars([plan[1] for _, plan in misses], max_workers):
+        pass
+
+    charts = []
+    chart_slots = []
+    for slot, (display_scalar, file_path, scalar_tag, color, key, filename) in misses:
+        series = _chart_series(display_scalar, file_path, scalar_tag, smoothing_mode, smoothing, decimation, dpi,
+                               x_axis, x_range)
+        if series is None:
+            continue
+        if output_dir is None:
+            save_path = render_cache.output_path(key, filename)
+        else:
+            save_path = os.path.join(output_dir, filename)
+        charts.append(make_chart(
+            *series, display_scalar, color, xlabel, ylabel, dpi, show_grid, font_family, font_size,
+            save_path, x_axis,
+        ))
+        chart_slots.append(slot)
+
+    for i, save_path in iter_render_charts(charts, render_workers):
+        slots[chart_slots[i]] = save_path
+        yield [path for path in slots if path]
+
+    if charts and output_dir is None:
+        render_cache.enforce_quota(keep=[plan[4] for _, plan in misses])
 
+
+def plot_selected_scalars(*args, **kwargs):
     saved_files = []
-    color_palette = sns.color_palette("tab10", n_colors=20)
-    color_cycle = iter(color_palette)
-    save_dir = tempfile.mkdtemp()
+    for saved_files in iter_plot_selected_scalars(*args, **kwargs):
+        pass
+    return saved_files
 
-    font_props = FontProperties(family=font_family if font_family else None, size=font_size)
 
-    for display_scalar in selected_scalars:
-        ori_key = reverse_title_map.get(display_scalar, display_scalar)
+# 多 run 聚合绘图: 选中的 scalar 按 tag 分图, 同一图中按 group_pattern 把 run 分组,
+# 每组画一条中心线和一条阴影带; 每完成一张图产出一次图片列表 (按 tag 首次出现的顺序)
+def iter_plot_aggregated_scalars(
+    selected_paths,
+    selected_scalars,
+    xlabel,
+    ylabel,
+    dpi,
+    smoothing,
+    color_settings,
+    show_grid,
+    font_family,
+    font_size,
+    global_event_files,
+    group_pattern=DEFAULT_GROUP_PATTERN,
+    band="std",
+    smoothing_mode="moving_average",
+    max_workers=None,
+    render_workers=None,
+    x_axis="step",
+    x_range=None,
+):
+    scalar_map = get_all_scalars(selected_paths, global_event_files, max_workers)
+    short_by_full = {full: short for short, full in global_event_files}
 
-        if ori_key not in scalar_map:
-            print(f"[\u8b66\u544a] Scalar '{display_scalar}' (原始: {ori_key}) 不在 scalar_map 中, 跳过")
+    # tag -> {相对路径: event 文件}
+    runs_by_tag = {}
+    for key in selected_scalars:
+        if key not in scalar_map:
+            print(f"[警告] Scalar '{key}' 不在 scalar_map 中, 跳过")
             continue
+        file_path, scalar_tag = scalar_map[key]
+        runs_by_tag.setdefault(scalar_tag, {})[short_by_full.get(file_path, file_path)] = file_path
 
-        file_path, scalar_tag = scalar_map[ori_key]
+    font_path = uploaded_fonts.get(font_family)
+    n_points = point_budget(dpi, FIGSIZE)
+    slots = []
+    misses = []
+    for scalar_tag, runs in runs_by_tag.items():
+        groups = group_runs(list(runs), group_pattern)
+        filename = f"{sanitize_filename(scalar_tag)}_agg.png"
+        # 指纹与路径无关, 同样的日志放在不同目录下时图例 (组名) 不同, 键中需包含 run 路径与分组
+        key = render_cache.chart_key(
+            "aggregate", sorted((short, source_fingerprint(full)) for short, full in runs.items()),
+            sorted(groups.items()), scalar_tag, group_pattern, band,
+            smoothing_mode, smoothing, sorted(color_settings.items()), xlabel, ylabel, dpi, show_grid,
+            font_family, font_path, font_size, FIGSIZE, x_axis, x_range,
+        )
+        slots.append(render_cache.lookup(key, filename))
+        if slots[-1] is None:
+            misses.append((len(slots) - 1, scalar_tag, runs, groups, key, filename))
 
-        ea = EventAccumulator(file_path)
-        ea.Reload()
-        events = ea.Scalars(scalar_tag)
-        if not events:
-            print(f"[\u8b66\u544a] Scalar '{display_scalar}' 没有事件数据, 跳过")
+    if len(misses) < len(slots):
+        yield [path for path in slots if path]
+
+    for _ in iter_event_scalars(sorted({full for miss in misses for full in miss[2].values()}), max_workers):
+        pass
+
+    charts = []
+    chart_slots = []
+    for slot, scalar_tag, runs, groups, key, filename in misses:
+        color_cycle = itertools.cycle(TAB10)
+        lines = []
+        bands = []
+        for group, members in groups.items():
+            series = []
+            for short in members:
+                run_series = load_event_scalars(runs[short]).get(scalar_tag)
+                if run_series is not None and len(run_series):
+                    # 先在每个 run 的全量数据上平滑, 再插值到公共网格
+                    x, values = _curve(run_series, smoothing_mode, smoothing, x_axis, x_range)
+                    if len(x):
+                        series.append((x, values))
+            with stage("aggregate") as record:
+                grid, matrix = align_runs(series, n_points)
+                if grid.size == 0:
+                    continue
+                center, lower, upper, _ = reduce_runs(matrix, band)
+                record.points = matrix.size
+            color = color_settings.get(group, next(color_cycle))
+            lines.append((grid, center, f"{group} (n={len(series)})", color))
+            bands.append((grid, lower, upper, color))
+        if not lines:
+            print(f"[警告] Scalar '{scalar_tag}' 没有事件数据, 跳过")
             continue
+        chart = make_chart(None, None, scalar_tag, None, xlabel, ylabel, dpi, show_grid, font_family, font_size,
+                           render_cache.output_path(key, filename), x_axis)
+        chart["lines"] = lines
+        chart["bands"] = bands
+        charts.append(chart)
+        chart_slots.append(slot)
 
-        steps = [e.step for e in events]
-        values = smooth([e.value for e in events], smoothing)
+    for i, save_path in iter_render_charts(charts, render_workers):
+        slots[chart_slots[i]] = save_path
+        yield [path for path in slots if path]
 
-        fig, ax = plt.subplots(figsize=(10, 6), dpi=dpi)
+    if charts:
+        render_cache.enforce_quota(keep=[miss[4] for miss in misses])
 
-        label = display_scalar
-        color = color_settings.get(display_scalar, next(color_cycle))
-        ax.plot(steps, values, label=label, color=color)
 
-        ax.set_title(label, fontproperties=font_props)
-        ax.set_xlabel(xlabel or "Step", fontproperties=font_props)
-        ax.set_ylabel(ylabel or "Value", fontproperties=font_props)
-        ax.tick_params(axis='both', labelsize=font_size)
-        for tick in ax.get_xticklabels() + ax.get_yticklabels():
-            tick.set_fontproperties(font_props)
+# 导出格式: 下拉框显示名 -> 内部名
+EXPORT_FORMATS = {
+    "PNG 压缩包 (zip)": "zip",
+    "SVG 压缩包 (zip)": "svg",
+    "多页 PDF": "pdf",
+}
 
-        if show_grid:
-            ax.grid(True)
-        ax.legend(prop=font_props)
 
-        def sanitize_filename(name):
-            return re.sub(r'[\\/*?:"<>|()\s]', "_", name)
+# 一次性导出: 渲染结果直接写入压缩包或多页 PDF, 不经过临时 PNG 再打包
+#   zip: 渲染缓存中已有的 PNG 原样拷入, 其余在绘图进程中渲染到内存后写入; PNG 本身已压缩, 不再 deflate
+#   svg: 绘图进程渲染为 SVG 文本, deflate 写入 zip
+#   pdf: 按选择顺序逐页写入同一个 PDF
+# 每写完一张图产出一次 (已完成, 总数)
+def iter_export_selected_scalars(
+    selected_paths,
+    selected_scalars,
+    title_map,
+    xlabel,
+    ylabel,
+    dpi,
+    smoothing,
+    color_settings,
+    show_grid,
+    font_family,
+    font_size,
+    global_event_files,
+    archive_path,
+    export_format="zip",
+    smoothing_mode="moving_average",
+    max_workers=None,
+    render_workers=None,
+    decimation="minmax",
+    x_axis="step",
+    x_range=None,
+):
+    if export_format not in EXPORT_FORMATS.values():
+        raise ValueError(f"未知的导出格式: {export_format}")
+    plans = _plan_charts(
+        selected_paths, selected_scalars, title_map, xlabel, ylabel, dpi, smoothing, color_settings,
+        show_grid, font_family, font_size, global_event_files, smoothing_mode, max_workers, decimation,
+        x_axis, x_range,
+    )
+    cached = {}
+    if export_format == "zip":
+        cached = {i: render_cache.lookup(plan[4], plan[5]) for i, plan in enumerate(plans)}
+        cached = {i: path for i, path in cached.items() if path}
+    pending = [plan for i, plan in enumerate(plans) if i not in cached]
 
-        safe_title = sanitize_filename(ori_key)
-        save_path = os.path.join(save_dir, f"{safe_title}.png")
+    for _ in iter_event_scalars([plan[1] for plan in pending], max_workers):
+        pass
 
-        plt.savefig(save_path, bbox_inches='tight')
-        plt.close(fig)
+    suffix = ".svg" if export_format == "svg" else ".png"
+    charts = []
+    names = []
+    for display_scalar, file_path, scalar_tag, color, key, filename in pending:
+        series = _chart_series(display_scalar, file_path, scalar_tag, smoothing_mode, smoothing, decimation, dpi,
+                               x_axis, x_range)
+        if series is None:
+            continue
+        chart = make_chart(*series, display_scalar, color, xlabel, ylabel, dpi, show_grid,
+                           font_family, font_size, None, x_axis)
+        chart["format"] = export_format if export_format == "svg" else "png"
+        charts.append(chart)
+        names.append(os.path.splitext(filename)[0] + suffix)
 
-        saved_files.append(save_path)
+    total = len(cached) + len(charts)
+    if export_format == "pdf":
+        # 逐页绘制与写入交替进行, export 阶段包含各页的绘制时间
+        with stage("export") as record:
+            for i in iter_render_pdf(charts, archive_path):
+                yield i + 1, total
+            record.bytes = os.path.getsize(archive_path)
+        return
 
-    return saved_files
+    compression = zipfile.ZIP_DEFLATED if export_format == "svg" else zipfile.ZIP_STORED
+    done = 0
+    with zipfile.ZipFile(archive_path, "w", compression=compression, allowZip64=True) as zf:
+        for i, path in cached.items():
+            with stage("export") as record:
+                zf.write(path, arcname=plans[i][5])
+                record.bytes = os.path.getsize(path)
+            done += 1
+            yield done, total
+        rendered = iter_render_charts(charts, render_workers, to_bytes=True)
+        for i, data in rendered:
+            with stage("export") as record:
+                zf.writestr(names[i], data)
+                record.bytes = len(data)
+            done += 1
+            yield done, total
+
+
+# 返回写入的图数
+def export_selected_scalars(*args, **kwargs):
+    done = 0
+    for done, _ in iter_export_selected_scalars(*args, **kwargs):
+        pass
+    return done
+
+
+# 交互式预览: 平滑后降采样的曲线, 返回 (表格, 颜色映射) 交给浏览器端的 gr.LinePlot 绘制,
+# 缩放、显隐、配色都在浏览器完成; 数据量受点数上限约束, 与原始步数无关
+def preview_scalars(
+    selected_paths,
+    selected_scalars,
+    title_map,
+    smoothing,
+    color_settings,
+    global_event_files,
+    smoothing_mode="moving_average",
+    max_workers=None,
+    decimation="minmax",
+    x_axis="step",
+    x_range=None,
+):
+    import pandas as pd
+
+    scalar_map = get_all_scalars(selected_paths, global_event_files, max_workers)
+    reverse_title_map = {v: k for k, v in title_map.items()}
+    picked = []
+    for display_scalar in selected_scalars:
+        ori_key = reverse_title_map.get(display_scalar, display_scalar)
+        if ori_key in scalar_map:
+            picked.append((display_scalar, *scalar_map[ori_key]))
+
+    for _ in iter_event_scalars(sorted({file_path for _, file_path, _ in picked}), max_workers):
+        pass
+
+    # 预览必须有点数上限, 选了"不降采样"时也按包络降采样
+    mode = decimation if decimation != "none" else "minmax"
+    budget = max(16, min(PREVIEW_POINTS, PREVIEW_MAX_TOTAL_POINTS // max(1, len(picked))))
+    color_cycle = itertools.cycle(TAB10)
+    frames = []
+    color_map = {}
+    for label, file_path, scalar_tag in picked:
+        series = load_event_scalars(file_path).get(scalar_tag)
+        if series is None or len(series) == 0:
+            continue
+        x, values = decimate(*_curve(series, smoothing_mode, smoothing, x_axis, x_range), mode, budget)
+        if x_axis == "wall_time":
+            x = pd.to_datetime(x, unit="s")
+        frames.append(pd.DataFrame({"x": x, "value": values, "scalar": label}))
+        color_map[label] = color_settings.get(label, next(color_cycle))
+
+    if not frames:
+        return pd.DataFrame({"x": [], "value": [], "scalar": pd.Series([], dtype=object)}), color_map
+    return pd.concat(frames, ignore_index=True), color_map
+
+
+# 跟踪模式绘图: 只重绘数据或样式有变化的 scalar
+# chart_paths: {key: (签名, png 路径)}, 由调用方跨次保留; 返回按选择顺序排列的图片列表
+def plot_followed_scalars(
+    follower,
+    selected_scalars,
+    chart_paths,
+    save_dir,
+    xlabel,
+    ylabel,
+    dpi,
+    smoothing,
+    color_settings,
+    show_grid,
+    font_family,
+    font_size,
+    smoothing_mode="moving_average",
+    render_workers=None,
+    decimation="minmax",
+    x_axis="step",
+    x_range=None,
+):
+    color_palette = TAB10
+    charts = []
+    for i, key in enumerate(selected_scalars):
+        version = follower.versions.get(key, 0)
+        color = color_settings.get(key, color_palette[i % len(color_palette)])
+        signature = (version, smoothing_mode, smoothing, decimation, color,
+                     xlabel, ylabel, dpi, show_grid, font_family, font_size, x_axis, x_range)
+        if key in chart_paths and chart_paths[key][0] == signature:
+            continue
+        series = follower.get_series(key)
+        if series is None or len(series) == 0:
+            continue
+        x, values = decimate(*_curve(series, smoothing_mode, smoothing, x_axis, x_range),
+                             decimation, point_budget(dpi, FIGSIZE))
+        # 签名变化时换新文件名, 避免浏览器缓存旧图
+        digest = hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:10]
+        save_path = os.path.join(save_dir, f"{sanitize_filename(key)}_{digest}.png")
+        chart = make_chart(x, values, key, color, xlabel, ylabel, dpi, show_grid, font_family, font_size, save_path,
+                           x_axis)
+        charts.append((key, signature, chart))
+
+    rendered = iter_render_charts([chart for _, _, chart in charts], render_workers)
+    for j, save_path in rendered:
+        key, signature, _ = charts[j]
+        old = chart_paths.get(key)
+        if old and old[1] != save_path and os.path.exists(old[1]):
+            os.remove(old[1])
+        chart_paths[key] = (signature, save_path)
+
+    return [chart_paths[key][1] for key in selected_scalars if key in chart_paths]
@@ -0,0 +1,214 @@
+import io
+import os
+import time
+import functools
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.scheduler import iter_pool
+from utils.metrics import metered, record_stage
+from utils.series import X_AXIS_LABELS
+
+# matplotlib 导入较慢 (含字体缓存加载), 只在第一次绘图或后台预热时导入
+
+# 绘图进程数, 可通过环境变量覆盖
+DEFAULT_RENDER_WORKERS = int(os.environ.get("TB_DRAW_RENDER_WORKERS", os.cpu_count() or 1))
+
+FIGSIZE = (10, 6)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# 同一进程内复用 FontProperties; 上传的字体直接按文件路径加载, 不经过 fontManager 查找
+@functools.lru_cache(maxsize=64)
+def _font_properties(family, path, size):
+    from matplotlib.font_manager import FontProperties
+    if path:
+        return FontProperties(fname=path, size=size)
+    return FontProperties(family=family or None, size=size)
+
+
+# 按 chart 构造 Figure; chart 为纯数据字典, 可跨进程传递
+#   lines: [(x, y, label, color), ...]
+#   bands: [(x, lower, upper, color), ...] (可选, 多 run 聚合的阴影带)
+#   title / xlabel / ylabel / dpi / show_grid / font_family / font_path / font_size / save_path
+#   x_axis: step / relative / wall_time (可选, wall_time 的 x 为 Unix 时间戳, 画成日期刻度)
+def _draw(chart):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    font_props = _font_properties(chart["font_family"], chart.get("font_path"), chart["font_size"])
+
+    # 面向对象接口, 不经过 pyplot 全局状态, 可在线程/进程中并发使用
+    fig = Figure(figsize=FIGSIZE, dpi=chart["dpi"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    x_axis = chart.get("x_axis", "step")
+    as_x = _to_datetime if x_axis == "wall_time" else _identity
+
+    for x, lower, upper, color in chart.get("bands", ()):
+        ax.fill_between(as_x(x), lower, upper, color=color, alpha=0.2, linewidth=0)
+    for x, y, label, color in chart["lines"]:
+        ax.plot(as_x(x), y, label=label, color=color)
+
+    ax.set_title(chart["title"], fontproperties=font_props)
+    ax.set_xlabel(chart["xlabel"] or X_AXIS_LABELS[x_axis], fontproperties=font_props)
+    ax.set_ylabel(chart["ylabel"] or "Value", fontproperties=font_props)
+    ax.tick_params(axis='both', labelsize=chart["font_size"])
+    for tick in ax.get_xticklabels() + ax.get_yticklabels():
+        tick.set_fontproperties(font_props)
+
+    if x_axis == "wall_time":
+        fig.autofmt_xdate()
+    if chart["show_grid"]:
+        ax.grid(True)
+    ax.legend(prop=font_props)
+    return fig
+
+
+def _identity(x):
+    return x
+
+
+# Unix 时间戳 (秒) -> datetime64, matplotlib 自动使用日期刻度; 只转换降采样后的点
+def _to_datetime(x):
+    return (np.asarray(x, dtype=np.float64) * 1e6).astype(np.int64).astype("datetime64[us]")
+
+
+# 渲染一张图并保存为 PNG, 返回 (save_path, 绘制耗时, savefig 耗时)
+def _render_file_timed(chart):
+    start = time.perf_counter()
+    fig = _draw(chart)
+    drawn = time.perf_counter()
+    # 先写临时文件再替换, 并发渲染同一张图时不会读到半个文件
+    tmp_path = f"{chart['save_path']}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        fig.savefig(tmp_path, format="png", bbox_inches='tight')
+        os.replace(tmp_path, chart["save_path"])
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return chart["save_path"], drawn - start, time.perf_counter() - drawn
+
+
+# 渲染到内存 (chart["format"]: png / svg), 返回 (图片字节, 绘制耗时, savefig 耗时)
+def _render_bytes_timed(chart):
+    start = time.perf_counter()
+    fig = _draw(chart)
+    drawn = time.perf_counter()
+    buf = io.BytesIO()
+    fig.savefig(buf, format=chart.get("format", "png"), bbox_inches='tight')
+    return buf.getvalue(), drawn - start, time.perf_counter() - drawn
+
+
+def render_chart(chart):
+    return _render_file_timed(chart)[0]
+
+
+# 导出时直接写入压缩包, 不落盘
+def render_chart_bytes(chart):
+    return _render_bytes_timed(chart)[0]
+
+
+def _chart_points(chart):
+    return sum(len(line[0]) for line in chart["lines"])
+
+
+# 记录子进程测得的绘制与编码耗时
+def _record_timings(chart, draw_seconds, save_seconds, output_bytes):
+    record_stage("draw", draw_seconds, points=_chart_points(chart))
+    record_stage("savefig", save_seconds, bytes=output_bytes)
+
+
+# 在当前进程中逐页写入多页 PDF (Figure 不跨进程传递), 每写完一页产出一次下标
+def iter_render_pdf(charts, pdf_path):
+    from matplotlib.backends.backend_pdf import PdfPages
+    with PdfPages(pdf_path) as pdf:
+        for i, chart in enumerate(charts):
+            start = time.perf_counter()
+            try:
+                fig = _draw(chart)
+            except Exception as e:
+                print(f"[警告] 绘制 '{chart['title']}' 失败, 跳过: {e}")
+                continue
+            drawn = time.perf_counter()
+            pdf.savefig(fig, bbox_inches='tight')
+            _record_timings(chart, drawn - start, time.perf_counter() - drawn, 0)
+            yield i
+
+
+# 界面启动后在后台线程里预先导入 matplotlib 并加载字体缓存, 缩短第一次绘图的等待
+def warm_up():
+    from matplotlib.figure import Figure  # noqa: F401
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: F401
+    from matplotlib.font_manager import fontManager
+    fontManager.findfont("DejaVu Sans")
+
+
+# 全局共享绘图进程池, 大小固定; 字体按路径随任务传入, 上传新字体无需换池
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=DEFAULT_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+# 进程池崩溃后丢弃, 下次使用时重建; 其他请求可能已换上新池, 只替换仍是 broken 的那个
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+# 并行渲染, 按完成顺序产出 (index, save_path); to_bytes=True 时产出 (index, 图片字节)
+def iter_render_charts(charts, max_workers=None, to_bytes=False):
+    return metered("render", _iter_render_charts(charts, max_workers, to_bytes), points_of=lambda _: 1)
+
+
+def _iter_render_charts(charts, max_workers, to_bytes):
+    render = _render_bytes_timed if to_bytes else _render_file_timed
+    max_workers = max(1, int(max_workers or DEFAULT_RENDER_WORKERS))
+    if max_workers == 1 or len(charts) <= 1:
+        results = _iter_local_results(charts, render)
+    else:
+        results = _iter_pool_results(charts, render, max_workers)
+    for i, (result, draw_seconds, save_seconds) in results:
+        output_bytes = len(result) if to_bytes else os.path.getsize(result)
+        _record_timings(charts[i], draw_seconds, save_seconds, output_bytes)
+        yield i, result
+
+
+# 在当前进程中逐张绘制, 与进程池路径一样跳过失败的图
+def _iter_local_results(charts, render):
+    for i, chart in enumerate(charts):
+        try:
+            result = render(chart)
+        except Exception as e:
+            print(f"[警告] 绘制 '{chart['title']}' 失败, 跳过: {e}")
+            continue
+        yield i, result
+
+
+def _iter_pool_results(charts, render, max_workers):
+    for i, future in iter_pool(_get_pool, _reset_pool, render, charts, max_workers):
+        try:
+            yield i, future.result()
+        except Exception as e:
+            print(f"[警告] 绘制 '{charts[i]['title']}' 失败, 跳过: {e}")
@@ -0,0 +1,102 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+
+# 渲染结果缓存: 以 (数据指纹 + 样式参数) 的哈希为键, 命中时直接返回已有 PNG
+#
+#   <CACHE_DIR>/<key>/<可读文件名>.png
+#
+# 目录的修改时间即最近使用时间, 超出磁盘配额时按 LRU 删除
+
+CACHE_DIR = os.environ.get(
+    "TB_DRAW_RENDER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tensorboard_draw", "charts"),
+)
+MAX_CACHE_BYTES = int(os.environ.get("TB_DRAW_RENDER_CACHE_MB", "1024")) * 1024 * 1024
+# 最近交给界面的条目在这段时间 (秒) 内不被淘汰, 避免另一个请求清理配额时删掉浏览器正要加载的图片
+SERVE_GRACE_SECONDS = float(os.environ.get("TB_DRAW_RENDER_CACHE_GRACE", "600"))
+
+# 渲染逻辑变化时递增, 使旧缓存全部失效
+RENDER_VERSION = 1
+
+_lock = threading.Lock()
+_served = {}  # key -> 最近一次命中或分配的时间 (time.monotonic)
+
+
+def chart_key(*parts):
+    payload = repr((RENDER_VERSION,) + parts).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def _entry_dir(key):
+    return os.path.join(CACHE_DIR, key)
+
+
+def _mark_served(key):
+    with _lock:
+        _served[key] = time.monotonic()
+
+
+# 命中返回 PNG 路径并刷新使用时间, 未命中返回 None
+def lookup(key, filename):
+    path = os.path.join(_entry_dir(key), filename)
+    if not os.path.isfile(path):
+        return None
+    _mark_served(key)
+    try:
+        os.utime(_entry_dir(key))
+    except OSError:
+        pass
+    return path
+
+
+# 为未命中的键分配输出路径, 渲染器直接写到这里
+def output_path(key, filename):
+    entry = _entry_dir(key)
+    _mark_served(key)
+    os.makedirs(entry, exist_ok=True)
+    return os.path.join(entry, filename)
+
+
+def _dir_size(path):
+    total = 0
+    for name in os.listdir(path):
+        try:
+            total += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    return total
+
+
+# 超出配额时从最久未使用的条目开始删除; keep 中的键以及 SERVE_GRACE_SECONDS 内
+# 交给过任一请求的键 (包括其他会话正在显示的命中) 本次不删除
+def enforce_quota(keep=()):
+    if not os.path.isdir(CACHE_DIR):
+        return
+    with _lock:
+        now = time.monotonic()
+        for key in [k for k, t in _served.items() if now - t > SERVE_GRACE_SECONDS]:
+            del _served[key]
+        entries = []
+        total = 0
+        for key in os.listdir(CACHE_DIR):
+            entry = _entry_dir(key)
+            try:
+                mtime = os.path.getmtime(entry)
+                size = _dir_size(entry)
+            except OSError:
+                continue
+            entries.append((mtime, key, size))
+            total += size
+        if total <= MAX_CACHE_BYTES:
+            return
+        keep = set(keep) | set(_served)
+        for _, key, size in sorted(entries):
+            if total <= MAX_CACHE_BYTES:
+                break
+            if key in keep:
+                continue
+            shutil.rmtree(_entry_dir(key), ignore_errors=True)
+            total -= size
@@ -0,0 +1,280 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.event_reader import read_event_scalars, read_event_tags
+from utils.series import ScalarSeries
+from utils.scalar_store import is_store_path, load_store_series, load_store_tags, store_fingerprint
+
+# 磁盘缓存目录与内存预算, 可通过环境变量覆盖
+CACHE_DIR = os.environ.get(
+    "TB_DRAW_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tensorboard_draw", "scalars"),
+)
+MAX_MEMORY_BYTES = int(os.environ.get("TB_DRAW_CACHE_MB", "512")) * 1024 * 1024
+# 磁盘缓存配额, 超出时按最近使用时间 (文件 mtime) 删除最旧的 .npz
+MAX_DISK_BYTES = int(os.environ.get("TB_DRAW_CACHE_DISK_MB", "4096")) * 1024 * 1024
+# 内容键只哈希文件开头和结尾各这么多字节
+CONTENT_SAMPLE_BYTES = int(os.environ.get("TB_DRAW_CACHE_SAMPLE_MB", "1")) * 1024 * 1024
+
+# 内存 LRU: 文件指纹 -> {tag: ScalarSeries}
+_memory_cache = OrderedDict()
+_memory_sizes = {}
+_memory_bytes = 0
+_lock = threading.Lock()
+
+# 仅 tag 列表的轻量缓存: 文件指纹 -> [tag, ...]
+MAX_TAG_ENTRIES = 4096
+_tag_cache = OrderedDict()
+
+# 文件指纹 -> 内容键, 同一文件 (路径、大小、修改时间不变) 只哈希一次
+_content_keys = OrderedDict()
+
+
+# 文件指纹: 路径 + 大小 + 修改时间, 任一变化即视为新文件; 内存缓存以此为键, 只需一次 stat
+def file_fingerprint(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+# 内容键: 文件开头与结尾的 sha256 + 大小, 与路径无关; 用作磁盘缓存和渲染缓存的键,
+# 同一份日志每次上传都落在新的临时目录, 仍能命中
+# event 文件开头记录写入时间与主机, 追加写入会改变大小与结尾, 只读首尾即可区分, 不必读完整个文件
+def content_key(path):
+    fingerprint = file_fingerprint(path)
+    with _lock:
+        key = _content_keys.get(fingerprint)
+        if key is not None:
+            _content_keys.move_to_end(fingerprint)
+            return key
+    size = fingerprint[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(CONTENT_SAMPLE_BYTES))
+        if size > CONTENT_SAMPLE_BYTES:
+            f.seek(max(CONTENT_SAMPLE_BYTES, size - CONTENT_SAMPLE_BYTES))
+            digest.update(f.read(CONTENT_SAMPLE_BYTES))
+    key = f"{digest.hexdigest()[:40]}_{size}"
+    with _lock:
+        _content_keys[fingerprint] = key
+        while len(_content_keys) > MAX_TAG_ENTRIES:
+            _content_keys.popitem(last=False)
+    return key
+
+
+# event 文件或列式存储 run 的数据指纹
+def source_fingerprint(path):
+    if is_store_path(path):
+        return store_fingerprint(path)
+    return content_key(path)
+
+
+def _series_nbytes(series):
+    return sum(s.nbytes for s in series.values())
+
+
+# 完整解析一个 event 文件的全部 scalar (不做 reservoir 采样)
+def _parse_event_file(path):
+    return read_event_scalars(path)
+
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.npz")
+
+
+def _load_from_disk(key):
+    path = _disk_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        os.utime(path)  # 刷新最近使用时间
+        with np.load(path, allow_pickle=False) as data:
+            tags = [str(t) for t in data["tags"]]
+            return {
+                tag: ScalarSeries(data[f"s{i}"], data[f"w{i}"], data[f"v{i}"])
+                for i, tag in enumerate(tags)
+            }
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[警告] 缓存文件 {path} 损坏, 重新解析: {e}")
+        return None
+
+
+def _save_to_disk(key, series):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        arrays = {"tags": np.array(list(series.keys()), dtype=str)}
+        for i, (steps, wall_times, values) in enumerate(s.columns() for s in series.values()):
+            arrays[f"s{i}"] = steps
+            arrays[f"w{i}"] = wall_times
+            arrays[f"v{i}"] = values
+        # 先写临时文件再原子替换, 避免并发读到半个文件
+        tmp_path = _disk_path(key) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, _disk_path(key))
+    except OSError as e:
+        print(f"[警告] 写入 scalar 缓存失败: {e}")
+        return
+    _enforce_disk_quota(keep=key)
+
+
+# 超出磁盘配额时从最久未使用的 .npz 开始删除 (刚写入的 keep 除外)
+# 解析进程也会写缓存, 删除与读取可能并发, 读到被删的文件时按未命中重新解析
+def _enforce_disk_quota(keep=None):
+    entries = []
+    total = 0
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(".npz"):
+            continue
+        try:
+            st = os.stat(os.path.join(CACHE_DIR, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, name, st.st_size))
+        total += st.st_size
+    if total <= MAX_DISK_BYTES:
+        return
+    for _, name, size in sorted(entries):
+        if total <= MAX_DISK_BYTES:
+            break
+        if name == f"{keep}.npz":
+            continue
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except OSError:
+            continue
+        total -= size
+
+
+def _remember(key, series):
+    global _memory_bytes
+    size = _series_nbytes(series)
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return
+        _memory_cache[key] = series
+        _memory_sizes[key] = size
+        _memory_bytes += size
+        # 超出预算时按 LRU 淘汰, 但至少保留刚放入的一项
+        while _memory_bytes > MAX_MEMORY_BYTES and len(_memory_cache) > 1:
+            old_key, _ = _memory_cache.popitem(last=False)
+            _memory_bytes -= _memory_sizes.pop(old_key)
+
+
+# 读取 event 文件的全部 scalar: 列式存储 -> 内存 -> 磁盘 -> 解析
+def load_event_scalars(path):
+    if is_store_path(path):
+        return load_store_series(path)
+    key = file_fingerprint(path)
+    with _lock:
+        series = _memory_cache.get(key)
+        if series is not None:
+            _memory_cache.move_to_end(key)
+            return series
+
+    series = parse_event_scalars(path)
+    _remember(key, series)
+    return series
+
+
+# 磁盘缓存 -> 解析并写入磁盘缓存, 不放入本进程的内存缓存; 解析进程用它, 结果由主进程登记
+def parse_event_scalars(path):
+    if is_store_path(path):
+        return load_store_series(path)
+    key = content_key(path)
+    series = _load_from_disk(key)
+    if series is None:
+        series = _parse_event_file(path)
+        _save_to_disk(key, series)
+    return series
+
+
+def _remember_tags(key, tags):
+    with _lock:
+        _tag_cache[key] = tags
+        _tag_cache.move_to_end(key)
+        while len(_tag_cache) > MAX_TAG_ENTRIES:
+            _tag_cache.popitem(last=False)
+
+
+# 只读取 tag 列表: 列式存储 -> 已解析的数据 -> tag 缓存 -> 磁盘缓存 -> 快速扫描
+def load_event_tags(path):
+    if is_store_path(path):
+        return load_store_tags(path)
+    key = file_fingerprint(path)
+    with _lock:
+        series = _memory_cache.get(key)
+        if series is not None:
+            return list(series.keys())
+        tags = _tag_cache.get(key)
+        if tags is not None:
+            return list(tags)
+
+    tags = None
+    disk_path = _disk_path(content_key(path))
+    if os.path.exists(disk_path):
+        try:
+            with np.load(disk_path, allow_pickle=False) as data:
+                tags = [str(t) for t in data["tags"]]
+        except (OSError, ValueError, KeyError):
+            tags = None
+    if tags is None:
+        tags = read_event_tags(path)
+    _remember_tags(key, tags)
+    return list(tags)
+
+
+# 只查内存, 未命中返回 None (不触发解析); 列式存储直接 mmap 返回
+def peek_event_scalars(path):
+    if is_store_path(path):
+        return load_store_series(path)
+    key = file_fingerprint(path)
+    with _lock:
+        series = _memory_cache.get(key)
+        if series is not None:
+            _memory_cache.move_to_end(key)
+        return series
+
+
+def peek_event_tags(path):
+    if is_store_path(path):
+        return load_store_tags(path)
+    key = file_fingerprint(path)
+    with _lock:
+        series = _memory_cache.get(key)
+        if series is not None:
+            return list(series.keys())
+        tags = _tag_cache.get(key)
+        return list(tags) if tags is not None else None
+
+
+# 登记在其他进程中解析好的结果
+def remember_event_scalars(path, series):
+    _remember(file_fingerprint(path), series)
+
+
+def remember_event_tags(path, tags):
+    _remember_tags(file_fingerprint(path), list(tags))
+
+
+# 清空缓存 (内存, 可选磁盘)
+def clear_cache(disk=False):
+    global _memory_bytes
+    with _lock:
+        _memory_cache.clear()
+        _memory_sizes.clear()
+        _memory_bytes = 0
+        _tag_cache.clear()
+    if disk and os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith(".npz"):
+                try:
+                    os.remove(os.path.join(CACHE_DIR, name))
+                except OSError:
+                    pass
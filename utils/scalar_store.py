@@ -0,0 +1,221 @@
+import os
+import json
+import struct
+import zipfile
+import threading
+import numpy as np
+from utils.series import ScalarSeries
+
+# 列式 scalar 存储: 每个 (run, tag) 一组 .npy 列, 外加一个 manifest 索引
+#
+#   <root>/tbstore.json
+#   <root>/runs/r0000/t0000.steps.npy   int64
+#   <root>/runs/r0000/t0000.wall_times.npy   float64
+#   <root>/runs/r0000/t0000.values.npy   float32 (早期版本写出的 float64 仍可读取)
+#
+# root 可以是目录, 也可以是导出的 zip (成员不压缩, 直接 mmap, 无需解压)
+
+MANIFEST_NAME = "tbstore.json"
+STORE_FORMAT = "tb-draw-store"
+STORE_VERSION = 1
+COLUMNS = ("steps", "wall_times", "values")
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+
+# 已打开的存储: root -> ScalarStore; 同一存储可被多个会话打开, 按引用计数关闭
+_open_stores = {}
+_store_refs = {}
+_lock = threading.Lock()
+
+
+# 从 path 的 offset 处读取 .npy 头并返回只读 memmap (零拷贝)
+def _memmap_npy(path, offset=0):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    order = "F" if fortran_order else "C"
+    return np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=shape, order=order)
+
+
+class ScalarStore:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.is_archive = os.path.isfile(self.root)
+        self._member_offsets = {}
+        if self.is_archive:
+            with zipfile.ZipFile(self.root) as zf:
+                manifest = json.loads(zf.read(MANIFEST_NAME).decode("utf-8"))
+                with open(self.root, "rb") as raw:
+                    for info in zf.infolist():
+                        if info.filename.endswith(".npy"):
+                            self._member_offsets[info.filename] = self._data_offset(raw, info)
+        else:
+            with open(os.path.join(self.root, MANIFEST_NAME), encoding="utf-8") as f:
+                manifest = json.load(f)
+        if manifest.get("format") != STORE_FORMAT:
+            raise ValueError(f"{root} 不是列式 scalar 存储")
+        self.runs = manifest["runs"]
+
+    @staticmethod
+    def _data_offset(raw, info):
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise ValueError(f"存储成员 {info.filename} 被压缩, 无法 mmap")
+        raw.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(raw.read(_LOCAL_HEADER.size))
+        name_len, extra_len = header[9], header[10]
+        return info.header_offset + _LOCAL_HEADER.size + name_len + extra_len
+
+    def run_path(self, run_id):
+        return os.path.join(self.root, "runs", run_id)
+
+    # [(原始相对路径, run 虚拟路径)], 与 upload_files 返回的 event 列表格式一致
+    def event_files(self):
+        return [(run["source"], self.run_path(run_id)) for run_id, run in self.runs.items()]
+
+    def _column(self, run_id, column_id, name):
+        member = f"runs/{run_id}/{column_id}.{name}.npy"
+        if self.is_archive:
+            return _memmap_npy(self.root, self._member_offsets[member])
+        return _memmap_npy(os.path.join(self.root, member))
+
+    def tags(self, run_id):
+        return list(self.runs[run_id]["tags"].keys())
+
+    # {tag: ScalarSeries}, 各列均为只读 memmap
+    def series(self, run_id):
+        return {
+            tag: ScalarSeries(*(self._column(run_id, column_id, name) for name in COLUMNS))
+            for tag, column_id in self.runs[run_id]["tags"].items()
+        }
+
+
+# 打开 (并登记) 一个存储, 返回 event 列表
+def open_store(root):
+    store = ScalarStore(root)
+    with _lock:
+        _open_stores[store.root] = store
+        _store_refs[store.root] = _store_refs.get(store.root, 0) + 1
+    return store.event_files()
+
+
+# 释放一次引用, 最后一个引用释放时关闭
+def close_store(root):
+    root = os.path.abspath(root)
+    with _lock:
+        refs = _store_refs.get(root, 0) - 1
+        if refs > 0:
+            _store_refs[root] = refs
+            return
+        _store_refs.pop(root, None)
+        _open_stores.pop(root, None)
+
+
+# 释放 event 列表中引用的存储 (会话结束或重新上传时调用), 每个存储释放一次
+def close_stores_for(event_files):
+    roots = set()
+    for _, path in event_files:
+        store, run_id = _lookup(path)
+        if store is not None:
+            roots.add(store.root)
+    for root in roots:
+        close_store(root)
+
+
+# 关闭 directory 下的全部存储 (删除上传目录前调用)
+def close_stores_under(directory):
+    prefix = os.path.join(os.path.abspath(directory), "")
+    with _lock:
+        for root in [r for r in _open_stores if r.startswith(prefix)]:
+            del _open_stores[root]
+            _store_refs.pop(root, None)
+
+
+def is_store_archive(path):
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return MANIFEST_NAME in zf.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def _lookup(path):
+    run_dir = os.path.dirname(path)
+    if os.path.basename(run_dir) != "runs":
+        return None, None
+    with _lock:
+        store = _open_stores.get(os.path.dirname(run_dir))
+    return store, os.path.basename(path)
+
+
+# 判断 path 是否为已打开存储中的 run 虚拟路径
+def is_store_path(path):
+    store, run_id = _lookup(path)
+    return store is not None and run_id in store.runs
+
+
+# run 的数据指纹: 存储位置 + run + manifest (或归档) 的大小与修改时间
+def store_fingerprint(path):
+    store, run_id = _lookup(path)
+    st = os.stat(store.root if store.is_archive else os.path.join(store.root, MANIFEST_NAME))
+    return store.root, run_id, st.st_size, st.st_mtime_ns
+
+
+def load_store_series(path):
+    store, run_id = _lookup(path)
+    return store.series(run_id)
+
+
+def load_store_tags(path):
+    store, run_id = _lookup(path)
+    return store.tags(run_id)
+
+
+# 写出一个 run 的全部列, 返回其 manifest 条目; 解析完一个就写一个, 整个 sweep 不必同时在内存中
+def write_run(store_dir, run_id, source, series):
+    run_dir = os.path.join(store_dir, "runs", run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    tags = {}
+    for t, (tag, arrays) in enumerate(series.items()):
+        column_id = f"t{t:04d}"
+        for name, arr in zip(COLUMNS, arrays.columns()):
+            np.save(os.path.join(run_dir, f"{column_id}.{name}.npy"), np.ascontiguousarray(arr))
+        tags[tag] = column_id
+    return {"source": source, "tags": tags}
+
+
+# 全部 run 写完后写 manifest; runs 为 {run_id: write_run 的返回值}
+def write_manifest(store_dir, runs):
+    manifest = {"format": STORE_FORMAT, "version": STORE_VERSION, "runs": dict(sorted(runs.items()))}
+    tmp_path = os.path.join(store_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_NAME))
+    return store_dir
+
+
+# 写出存储; items 为 [(原始相对路径, {tag: ScalarSeries})]
+def write_store(store_dir, items):
+    runs = {}
+    for r, (source, series) in enumerate(items):
+        run_id = f"r{r:04d}"
+        runs[run_id] = write_run(store_dir, run_id, source, series)
+    return write_manifest(store_dir, runs)
+
+
+# 导出为不压缩的 zip, 导入时可直接 mmap
+def export_store(store_dir, archive_path):
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        zf.write(os.path.join(store_dir, MANIFEST_NAME), arcname=MANIFEST_NAME)
+        runs_dir = os.path.join(store_dir, "runs")
+        for root, _, files in os.walk(runs_dir):
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                zf.write(full, arcname=os.path.relpath(full, store_dir).replace(os.sep, "/"))
+    return archive_path
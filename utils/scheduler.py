@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+# 各阶段允许同时执行的请求数 (所有用户共享), 可通过环境变量覆盖
+STAGE_LIMITS = {
+    "ingest": int(os.environ.get("TB_DRAW_INGEST_CONCURRENCY", "2")),
+    "parse": int(os.environ.get("TB_DRAW_PARSE_CONCURRENCY", "4")),
+    "render": int(os.environ.get("TB_DRAW_RENDER_CONCURRENCY", "4")),
+}
+
+
+# Gradio 事件监听的并发参数: 同一阶段的事件共享一个队列和并发上限
+def stage_kwargs(stage):
+    return {"concurrency_id": stage, "concurrency_limit": STAGE_LIMITS[stage]}
+
+
+# 进程池已崩溃时 submit 会直接抛出 BrokenProcessPool: 改为返回一个失败的 future, 按单个任务失败处理
+def _submit(pool, fn, item):
+    try:
+        return pool.submit(fn, item)
+    except BrokenProcessPool as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+
+# 向共享进程池提交 fn(item) 时只保持 window 个在途任务, 完成一个再补一个,
+# 按完成顺序产出 (item 下标, future)
+# 多个请求共用进程池时会交替排队, 大任务不会一次性占满队列
+def iter_windowed(pool, fn, items, window):
+    pending = iter(enumerate(items))
+    running = {}
+    for i, item in pending:
+        running[_submit(pool, fn, item)] = i
+        if len(running) >= window:
+            break
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            i = running.pop(future)
+            for j, item in pending:
+                running[_submit(pool, fn, item)] = j
+                break
+            yield i, future
+
+
+def _is_broken(future):
+    return isinstance(future.exception(), BrokenProcessPool)
+
+
+# 在 get_pool() 返回的共享进程池上按窗口执行, 产出同 iter_windowed
+# 工作进程被杀 (如解析超大文件时 OOM) 会使整个池失效: 调用 reset_pool(pool) 丢弃旧池,
+# 因此失败的任务在新池上重试一次, 仍失败则交给调用方按失败处理
+def iter_pool(get_pool, reset_pool, fn, items, window):
+    indices = list(range(len(items)))
+    for attempt in range(2):
+        pool = get_pool()
+        broken = []
+        for j, future in iter_windowed(pool, fn, [items[i] for i in indices], window):
+            if _is_broken(future):
+                reset_pool(pool)
+                if attempt == 0:
+                    broken.append(indices[j])
+                    continue
+            yield indices[j], future
+        if not broken:
+            return
+        print(f"[警告] 进程池异常退出, 已重新创建, 重试 {len(broken)} 个任务")
+        indices = broken
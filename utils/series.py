@@ -0,0 +1,103 @@
+import numpy as np
+
+# 横轴: 下拉框显示名 -> 内部名
+X_AXES = {
+    "Step": "step",
+    "相对时间 (小时)": "relative",
+    "墙钟时间": "wall_time",
+}
+
+X_AXIS_LABELS = {"step": "Step", "relative": "Relative time (h)", "wall_time": "Wall time"}
+
+
+# 一条 scalar 曲线: 三列连续的 NumPy 数组 (step int64, 墙钟时间 float64, 值 float32, 每点 20 字节)
+# 解析、缓存、列式存储、跟踪模式都直接持有这些数组, 平滑、降采样、绘图只取视图, 不复制
+class ScalarSeries:
+    __slots__ = ("steps", "wall_times", "values", "_sorted", "_origin")
+
+    # sorted_axes: 已知的 横轴 -> 是否非降序 (如跟踪模式的缓冲区增量维护), 省去重复检查
+    def __init__(self, steps, wall_times, values, sorted_axes=None):
+        # dtype 已一致时 asarray 不复制 (包括 memmap 与切片视图)
+        self.steps = np.asarray(steps, dtype=np.int64)
+        self.wall_times = np.asarray(wall_times, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float32)
+        self._sorted = dict(sorted_axes or {})  # 横轴 -> 是否非降序, 第一次按范围切片时检查并记住
+        self._origin = None  # 相对时间的起点
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, index):
+        return ScalarSeries(self.steps[index], self.wall_times[index], self.values[index])
+
+    def __repr__(self):
+        return f"ScalarSeries({len(self)} points)"
+
+    @property
+    def nbytes(self):
+        return self.steps.nbytes + self.wall_times.nbytes + self.values.nbytes
+
+    def columns(self):
+        return self.steps, self.wall_times, self.values
+
+    # 相对时间的起点: 最早的墙钟时间 (断点续训后第一条记录未必最早), 第一次使用时计算并记住
+    def _time_origin(self):
+        if self._origin is None:
+            self._origin = float(self.wall_times.min())
+        return self._origin
+
+    # 横轴数据: step / 相对最早记录的小时数 / Unix 时间戳 (秒); index 为 index_range 的结果,
+    # 相对时间只对取出的部分做换算
+    def x(self, axis="step", index=slice(None)):
+        if axis == "step":
+            return self.steps[index]
+        if axis == "wall_time":
+            return self.wall_times[index]
+        if axis == "relative":
+            return (self.wall_times[index] - self._time_origin()) / 3600 if len(self) else self.wall_times
+        raise ValueError(f"未知的横轴: {axis}")
+
+    def _is_sorted(self, axis):
+        column = self.steps if axis == "step" else self.wall_times
+        if axis not in self._sorted:
+            self._sorted[axis] = bool(column.size < 2 or np.all(column[1:] >= column[:-1]))
+        return self._sorted[axis]
+
+    # 横轴落在 [lo, hi] 内的点的下标, None 表示不限; 可直接索引本序列及与其等长的数组 (如平滑结果)
+    # 横轴非降序时二分查找, 返回 slice (取视图不复制); step 回退 (断点续训) 时退化为逐点比较的布尔掩码
+    def index_range(self, lo=None, hi=None, axis="step"):
+        if lo is None and hi is None:
+            return slice(None)
+        if axis == "relative" and len(self):
+            # 相对时间换算到墙钟时间上查找, 不生成新数组
+            offset = self._time_origin()
+            lo = None if lo is None else offset + lo * 3600
+            hi = None if hi is None else offset + hi * 3600
+            axis = "wall_time"
+        column = self.steps if axis == "step" else self.wall_times
+        if self._is_sorted(axis):
+            start = 0 if lo is None else int(np.searchsorted(column, lo, side="left"))
+            stop = len(column) if hi is None else int(np.searchsorted(column, hi, side="right"))
+            return slice(start, max(start, stop))
+        mask = np.ones(len(column), dtype=bool)
+        if lo is not None:
+            mask &= column >= lo
+        if hi is not None:
+            mask &= column <= hi
+        return mask
+
+    def between(self, lo=None, hi=None, axis="step"):
+        return self[self.index_range(lo, hi, axis)]
+
+
+# 界面上的横轴范围 (可为空) 转为 (lo, hi)
+def parse_x_range(x_min, x_max):
+    lo = None if x_min is None or x_min == "" else float(x_min)
+    hi = None if x_max is None or x_max == "" else float(x_max)
+    if lo is not None and hi is not None and lo > hi:
+        lo, hi = hi, lo
+    return lo, hi
@@ -0,0 +1,48 @@
+import os
+from utils.file_utils import remove_dir_async
+from utils.scalar_store import close_stores_under, close_stores_for
+
+# 会话空闲多久后清理 (秒), 可通过环境变量覆盖
+SESSION_TTL = int(os.environ.get("TB_DRAW_SESSION_TTL", str(6 * 3600)))
+
+
+# 单个用户会话的上传状态, 存放在 gr.State 中, 不同用户互不影响
+class Session:
+    __slots__ = ("tmp_dir", "event_files", "store_dir", "catalog", "last_trace", "follow_dir")
+
+    def __init__(self):
+        self.tmp_dir = None
+        self.event_files = []
+        self.store_dir = None
+        self.catalog = None  # utils.tag_index.TagIndex
+        self.last_trace = None  # utils.metrics.Trace, 最近一次请求的耗时统计
+        self.follow_dir = None  # 跟踪模式的图片目录
+
+
+# 删除跟踪模式的图片目录, 重新开始跟踪或会话结束时调用
+def release_follow_dir(session):
+    if session.follow_dir:
+        remove_dir_async(session.follow_dir)
+        session.follow_dir = None
+
+
+def ensure_session(session):
+    return session if session is not None else Session()
+
+
+# gr.State 过期或页面关闭后回调: 关闭存储并在后台删除上传目录与跟踪图片目录
+def close_session(session):
+    if session is None:
+        return
+    release_follow_dir(session)
+    if not session.tmp_dir:
+        return
+    # 直接上传的存储 zip 位于 Gradio 的上传目录而不是 tmp_dir 下, 需按引用单独释放
+    close_stores_for(session.event_files)
+    close_stores_under(session.tmp_dir)
+    remove_dir_async(session.tmp_dir)
+    session.tmp_dir = None
+    session.event_files = []
+    session.store_dir = None
+    session.catalog = None
+    session.last_trace = None
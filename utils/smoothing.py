@@ -0,0 +1,191 @@
+import math
+import numpy as np
+from utils.metrics import stage
+
+# 平滑方式: 下拉框显示名 -> 内部名
+SMOOTHING_MODES = {
+    "滑动平均": "moving_average",
+    "指数平均 (EMA)": "ema",
+    "高斯": "gaussian",
+    "中值": "median",
+}
+
+# 各平滑方式对应的参数滑块设置
+SMOOTHING_SLIDERS = {
+    "moving_average": dict(minimum=1, maximum=200, step=1, value=1, label="平滑窗口大小"),
+    "ema": dict(minimum=0, maximum=0.999, step=0.001, value=0.6, label="EMA 权重"),
+    "gaussian": dict(minimum=0, maximum=50, step=0.5, value=0, label="高斯 sigma"),
+    "median": dict(minimum=1, maximum=201, step=2, value=1, label="中值窗口大小"),
+}
+
+# EMA 分块时允许的最大缩放倍数, 控制 cumsum 的精度损失
+_EMA_MAX_SCALE = 1e6
+# 权重较小时 EMA 的系数 a^k 很快衰减到机器精度以下, 截断为不超过这么多抽头的 FIR 卷积, 结果与递推一致
+_EMA_MAX_TAPS = 512
+
+# 中值滤波每块的元素数 (块行数 x 窗口大小), 约 32 MB 的 float64
+_MEDIAN_CHUNK_ELEMENTS = 1 << 22
+
+
+# 滑动平均: 前缀和实现, O(n); 开头不足一个窗口时对已有的点取平均
+# 非有限值原样保留且不参与累计, 只影响包含它的窗口的点数, 不会污染之后的输出
+def moving_average(values, window):
+    window = int(window)
+    if window <= 1 or len(values) == 0:
+        return np.asarray(values)
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    if finite.all():
+        csum = np.cumsum(values)
+        out = np.empty_like(values)
+        head = min(window, values.size)
+        out[:head] = csum[:head] / np.arange(1, head + 1)
+        out[head:] = (csum[head:] - csum[:-head]) / window
+        return out
+
+    # 只对有限值求前缀和, 同时累计每个窗口内的有限点数
+    csum = np.cumsum(np.where(finite, values, 0.0))
+    count = np.cumsum(finite)
+    sums = csum.copy()
+    counts = count.astype(np.float64)
+    sums[window:] -= csum[:-window]
+    counts[window:] -= count[:-window]
+    out = np.full_like(values, np.nan)
+    np.divide(sums, counts, out=out, where=counts > 0)
+    out[~finite] = values[~finite]
+    return out
+
+
+def _ema_finite(values, weight):
+    n = values.size
+    # last_j = (1-a) * sum_k a^k * v_(j-k); a^k 小于 float64 精度后的项可以丢掉
+    taps = math.ceil(math.log(np.finfo(np.float64).eps) / math.log(weight)) + 1
+    if taps <= _EMA_MAX_TAPS:
+        kernel = (1 - weight) * weight ** np.arange(taps, dtype=np.float64)
+        out = np.convolve(values, kernel)[:n]
+    else:
+        out = _ema_blocks(values, weight)
+    # 与 TensorBoard 一致的去偏: 除以 1 - a^t
+    debias = 1 - weight ** np.arange(1, n + 1, dtype=np.float64)
+    return out / debias
+
+
+# 权重较大时分块递推: 块数约为 n * -log(a) / log(_EMA_MAX_SCALE), 每块几次向量运算
+def _ema_blocks(values, weight):
+    n = values.size
+    out = np.empty_like(values)
+    # last_j = a^(j+1) * carry + (1-a) * a^j * cumsum(v_k * a^-k), 分块避免 a^-k 溢出
+    block = max(1, int(math.log(_EMA_MAX_SCALE) / -math.log(weight)))
+    k = np.arange(block, dtype=np.float64)
+    powers = weight ** k
+    inv_powers = weight ** -k
+    carry = 0.0
+    for start in range(0, n, block):
+        chunk = values[start:start + block]
+        m = chunk.size
+        acc = np.cumsum(chunk * inv_powers[:m])
+        last = weight * powers[:m] * carry + (1 - weight) * powers[:m] * acc
+        out[start:start + m] = last
+        carry = last[-1]
+    return out
+
+
+# TensorBoard 同款去偏指数平均, weight ∈ [0, 1); 非有限值原样保留且不参与累计
+def ema(values, weight):
+    weight = float(weight)
+    if weight <= 0 or len(values) == 0:
+        return np.asarray(values)
+    values = np.asarray(values, dtype=np.float64)
+    weight = min(weight, 0.9999)
+    finite = np.isfinite(values)
+    if finite.all():
+        return _ema_finite(values, weight)
+    out = values.copy()
+    if finite.any():
+        out[finite] = _ema_finite(values[finite], weight)
+    return out
+
+
+# 高斯滤波: 截断到 ±3 sigma, 边缘按有效权重归一化
+def gaussian(values, sigma):
+    sigma = float(sigma)
+    if sigma <= 0 or len(values) < 2:
+        return np.asarray(values)
+    values = np.asarray(values, dtype=np.float64)
+    radius = max(1, int(3 * sigma + 0.5))
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    # mode="full" 再居中截取: 序列比核短时 mode="same" 返回的长度是核长, 不能用
+    center = slice(radius, radius + values.size)
+    weighted = np.convolve(values, kernel, mode="full")[center]
+    norm = np.convolve(np.ones_like(values), kernel, mode="full")[center]
+    return weighted / norm
+
+
+# 中值滤波: 居中窗口, 边缘用端点值填充
+# 窗口视图按块取中值, 每块最多 _MEDIAN_CHUNK_ELEMENTS 个元素, 内存与序列长度无关
+def median(values, window):
+    window = int(window)
+    if window <= 1 or len(values) == 0:
+        return np.asarray(values)
+    values = np.asarray(values, dtype=np.float64)
+    if window % 2 == 0:
+        window += 1
+    half = window // 2
+    padded = np.pad(values, half, mode="edge")
+    out = np.empty_like(values)
+    rows = max(1, _MEDIAN_CHUNK_ELEMENTS // window)
+    for start in range(0, values.size, rows):
+        stop = min(start + rows, values.size)
+        windows = np.lib.stride_tricks.sliding_window_view(padded[start:stop + 2 * half], window)
+        np.median(windows, axis=1, out=out[start:stop])
+    return out
+
+
+_SMOOTHERS = {
+    "moving_average": moving_average,
+    "ema": ema,
+    "gaussian": gaussian,
+    "median": median,
+}
+
+
+# 每个输出点依赖的输入范围 (向前点数, 向后点数); 向前为 None 表示依赖之前的全部点 (EMA)
+def _median_padding(window):
+    window = int(window)
+    if window <= 1:
+        return 0, 0
+    half = (window | 1) // 2
+    return half, half
+
+
+def _gaussian_padding(sigma):
+    sigma = float(sigma)
+    radius = max(1, int(3 * sigma + 0.5)) if sigma > 0 else 0
+    return radius, radius
+
+
+_PADDING = {
+    "moving_average": lambda window: (max(int(window), 1) - 1, 0),
+    "ema": lambda weight: (None, 0),
+    "gaussian": _gaussian_padding,
+    "median": _median_padding,
+}
+
+
+# 按名称分派平滑函数, 返回 values[index] 部分的平滑结果; 参数表示不平滑时原样返回, 不转换类型也不复制
+# index 为连续范围 (slice) 时只平滑该范围加上两侧核半径的部分, 结果与全量平滑后再截取一致;
+# EMA 依赖之前的全部点, 只能省去范围之后的部分
+def smooth_values(values, mode, param, index=slice(None)):
+    if mode not in _SMOOTHERS:
+        raise ValueError(f"未知的平滑方式: {mode}")
+    if not isinstance(index, slice):
+        return smooth_values(values, mode, param)[index]
+    start, stop, _ = index.indices(len(values))
+    stop = max(start, stop)
+    before, after = _PADDING[mode](param)
+    lo = 0 if before is None else max(0, start - before)
+    hi = min(len(values), stop + after)
+    with stage("smooth") as record:
+        record.points = hi - lo
+        return _SMOOTHERS[mode](values[lo:hi], param)[start - lo:stop - lo]
@@ -0,0 +1,136 @@
+import re
+import bisect
+
+# 服务端 scalar 目录: 每次上传建立一次索引, 搜索、分组、分页都在服务端完成,
+# 浏览器只收到当前页, 选择状态与显示名称也保存在这里
+
+SEARCH_MODES = {
+    "前缀": "prefix",
+    "正则": "regex",
+    "模糊": "fuzzy",
+}
+
+GROUP_MODES = {
+    "不分组": "none",
+    "按 run 分组": "run",
+    "按 tag 分组": "tag",
+}
+
+TABLE_HEADERS = ["选择", "显示名称", "tag", "run"]
+
+# 建立索引时 scalar 数不超过该值则默认全选, 与原先的行为一致; 更多时默认不选, 避免一次绘制上万张图
+AUTO_SELECT_LIMIT = 50
+
+
+class TagIndex:
+    # scalar_options: {"tag (run)": (event 文件, tag)}, 即 get_all_scalars 的返回值
+    def __init__(self, scalar_options=None, previous=None):
+        self.options = {}
+        self.keys = []
+        self.tags = []
+        self.runs = []
+        self._lower_keys = []
+        self._by_tag = []  # [(小写 tag, 下标)], 已排序, 用于前缀二分查找
+        self._by_run = []
+        self.selected = {}  # 有序集合: key -> None, 保持选择顺序
+        self.renames = {}  # key -> 显示名称
+        self.add(scalar_options or {})
+        if previous is not None:
+            # 重新建立索引时保留仍存在的 scalar 的选择和显示名称
+            self.selected = {key: None for key in previous.selected if key in self.options}
+            self.renames = {key: name for key, name in previous.renames.items() if key in self.options}
+        elif len(self.keys) <= AUTO_SELECT_LIMIT:
+            self.selected = dict.fromkeys(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # 追加新出现的 scalar (跟踪模式下新写入的 tag), 已有的忽略
+    def add(self, scalar_options):
+        added = [key for key in scalar_options if key not in self.options]
+        for key in added:
+            tag = scalar_options[key][1]
+            self.options[key] = scalar_options[key]
+            self.keys.append(key)
+            self.tags.append(tag)
+            self.runs.append(key[len(tag) + 2:-1])
+            self._lower_keys.append(key.lower())
+        if added:
+            self._by_tag = sorted((tag.lower(), i) for i, tag in enumerate(self.tags))
+            self._by_run = sorted((run.lower(), i) for i, run in enumerate(self.runs))
+        return added
+
+    @staticmethod
+    def _prefix_range(pairs, prefix):
+        lo = bisect.bisect_left(pairs, (prefix, -1))
+        hi = bisect.bisect_left(pairs, (prefix + "\uffff", -1))
+        return [i for _, i in pairs[lo:hi]]
+
+    # 返回匹配的下标列表; 模糊搜索按匹配跨度排序, 其余按建立顺序
+    def search(self, query, mode="prefix"):
+        query = (query or "").strip()
+        if not query:
+            return list(range(len(self.keys)))
+        if mode == "prefix":
+            q = query.lower()
+            hits = set(self._prefix_range(self._by_tag, q)) | set(self._prefix_range(self._by_run, q))
+            return sorted(hits)
+        if mode == "regex":
+            pattern = re.compile(query, re.IGNORECASE)
+            return [i for i, key in enumerate(self.keys) if pattern.search(key)]
+        if mode == "fuzzy":
+            # 查询字符按顺序出现即匹配 (如 "trnlss" 匹配 "train/loss"), 跨度越短越靠前
+            pattern = re.compile(".*?".join(map(re.escape, query.lower().replace(" ", ""))))
+            scored = []
+            for i, key in enumerate(self._lower_keys):
+                match = pattern.search(key)
+                if match:
+                    scored.append((match.end() - match.start(), match.start(), i))
+            return [i for *_, i in sorted(scored)]
+        raise ValueError(f"未知的搜索方式: {mode}")
+
+    # 分组排序后取一页, 返回 (表格行, 总页数, 实际页码); 页码从 1 开始
+    def page(self, hits, group_by="none", page=1, page_size=50):
+        if group_by == "run":
+            hits = sorted(hits, key=lambda i: (self.runs[i], self.tags[i]))
+        elif group_by == "tag":
+            hits = sorted(hits, key=lambda i: (self.tags[i], self.runs[i]))
+        page_size = max(1, int(page_size))
+        total_pages = max(1, -(-len(hits) // page_size))
+        page = min(max(1, int(page or 1)), total_pages)
+        rows = [self._row(i) for i in hits[(page - 1) * page_size:page * page_size]]
+        return rows, total_pages, page
+
+    def _row(self, i):
+        key = self.keys[i]
+        return [key in self.selected, self.renames.get(key, key), self.tags[i], self.runs[i]]
+
+    # 应用表格中的编辑 (勾选与显示名称), 行按 tag + run 定位
+    def apply_rows(self, rows):
+        for checked, name, tag, run in rows:
+            key = f"{tag} ({run})"
+            if key not in self.options:
+                continue
+            if checked:
+                self.selected.setdefault(key, None)
+            else:
+                self.selected.pop(key, None)
+            name = (name or "").strip()
+            if name and name != key:
+                self.renames[key] = name
+            else:
+                self.renames.pop(key, None)
+
+    def select(self, hits, checked=True):
+        for i in hits:
+            if checked:
+                self.selected.setdefault(self.keys[i], None)
+            else:
+                self.selected.pop(self.keys[i], None)
+
+    # 绘图用: 按选择顺序的显示名称列表, 以及 {原始 key: 显示名称}
+    def selected_scalars(self):
+        return [self.renames.get(key, key) for key in self.selected]
+
+    def title_map(self):
+        return dict(self.renames)